@@ -1,4 +1,7 @@
-from flask import Flask
+import time
+_import_started = time.perf_counter()
+
+from flask import Flask, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
@@ -7,25 +10,99 @@ import os
 load_dotenv()
 
 def create_app():
+    started = time.perf_counter()
     app = Flask(__name__)
-    CORS(app)
+    # Expose range/caching headers so PDF.js can make cross-origin range requests
+    CORS(app, expose_headers=['Accept-Ranges', 'Content-Range', 'Content-Length', 'ETag', 'Retry-After'])
 
     # Configure app
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
-    app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
+    app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER') or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
-    app.config['CURRENT_PDF'] = None  # Track the current PDF file path
+
+    # Upstream API endpoints (point these at tools/fake_upstream.py for load tests)
+    app.config['OPENAI_BASE_URL'] = os.getenv('OPENAI_BASE_URL') or None
+    app.config['ELEVENLABS_BASE_URL'] = os.getenv('ELEVENLABS_BASE_URL', 'https://api.elevenlabs.io').rstrip('/')
+
+    # Preload tokenizer and clients in the background after startup (off by default)
+    app.config['WARMUP_ON_START'] = os.getenv('WARMUP_ON_START', '0') == '1'
+
+    # Text extraction backends, tried in order (pymupdf, pdfium, pypdf2)
+    app.config['PDF_EXTRACTION_BACKENDS'] = os.getenv('PDF_EXTRACTION_BACKENDS', 'pymupdf,pdfium,pypdf2')
+
+    # Clean extracted text at ingestion (ligatures, hyphenation, headers/footers, whitespace)
+    app.config['NORMALIZE_TEXT'] = os.getenv('NORMALIZE_TEXT', '1') == '1'
+
+    # Passage embeddings for semantic page lookup (embedder: hashing or openai)
+    app.config['VECTOR_INDEX'] = os.getenv('VECTOR_INDEX', '1') == '1'
+    app.config['EMBEDDER'] = os.getenv('EMBEDDER', 'hashing')
+    # Related pages added to a question's page window; 0 disables
+    app.config['SEMANTIC_TOP_K'] = int(os.getenv('SEMANTIC_TOP_K', '2'))
+
+    # Concurrent model calls per batch question request
+    app.config['QA_BATCH_CONCURRENCY'] = int(os.getenv('QA_BATCH_CONCURRENCY', '4'))
+
+    # Admission control for expensive routes (Q&A, chat, TTS): per-client limits + fair queue.
+    # Limits apply per worker process; active + queued requests are capped to the worker's
+    # threads minus a reserve kept free for cheap routes (PDF range requests, TOC, health)
+    app.config['ADMISSION_MAX_ACTIVE'] = int(os.getenv('ADMISSION_MAX_ACTIVE', '4'))
+    app.config['ADMISSION_PER_CLIENT_ACTIVE'] = int(os.getenv('ADMISSION_PER_CLIENT_ACTIVE', '2'))
+    app.config['ADMISSION_PER_CLIENT_QUEUE'] = int(os.getenv('ADMISSION_PER_CLIENT_QUEUE', '2'))
+    app.config['ADMISSION_MAX_QUEUE'] = int(os.getenv('ADMISSION_MAX_QUEUE', '2'))
+    app.config['ADMISSION_WORKER_THREADS'] = int(os.getenv('ADMISSION_WORKER_THREADS', '8'))  # gunicorn --threads
+    app.config['ADMISSION_RESERVED_THREADS'] = int(os.getenv('ADMISSION_RESERVED_THREADS', '2'))
+    app.config['ADMISSION_RATE'] = float(os.getenv('ADMISSION_RATE', '1.0'))  # requests/second per client
+    app.config['ADMISSION_BURST'] = int(os.getenv('ADMISSION_BURST', '10'))
+    app.config['ADMISSION_QUEUE_TIMEOUT'] = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '30'))  # seconds
+    app.config['ADMISSION_TRUST_FORWARDED'] = os.getenv('ADMISSION_TRUST_FORWARDED', '0') == '1'
+    app.config['ADMISSION_TRUST_CLIENT_ID'] = os.getenv('ADMISSION_TRUST_CLIENT_ID', '0') == '1'
+
+    # Max seconds to wait on an identical in-flight upstream request before giving up
+    app.config['SINGLEFLIGHT_TIMEOUT'] = float(os.getenv('SINGLEFLIGHT_TIMEOUT', '120'))
+
+    # Storage janitor: disk quota with LRU eviction, swept on a timer
+    app.config['STORAGE_QUOTA_MB'] = int(os.getenv('STORAGE_QUOTA_MB', '500'))
+    app.config['JANITOR_INTERVAL'] = int(os.getenv('JANITOR_INTERVAL', '300'))  # seconds
+    app.config['TEMP_AUDIO_MAX_AGE'] = int(os.getenv('TEMP_AUDIO_MAX_AGE', '3600'))  # seconds
 
     # Ensure upload directory exists with proper permissions
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.chmod(app.config['UPLOAD_FOLDER'], 0o755)  # rwxr-xr-x
 
+    # Shared state (current document, history, artifact manifest) for all workers
+    from .utils import state, janitor, admission
+    state.init_app(app)
+    janitor.init_app(app)
+    admission.init_app(app)
+
+    # Negotiate gzip/brotli for JSON and text responses
+    from .utils import compression
+    compression.init_app(app)
+
     # Register blueprints
     from .routes import pdf_routes, qa_routes, tts_routes
     app.register_blueprint(pdf_routes.bp)
     app.register_blueprint(qa_routes.bp)
     app.register_blueprint(tts_routes.bp)
 
+    @app.route('/api/health', methods=['GET'])
+    def health():
+        """Liveness check that also reports startup and warm-up timings"""
+        return jsonify({'status': 'ok', 'startup': app.config['STARTUP_REPORT']}), 200
+
+    # Startup timing report (heavy subsystems are imported lazily on first use)
+    app.config['STARTUP_REPORT'] = {
+        'import_ms': round((started - _import_started) * 1000, 1),
+        'create_app_ms': round((time.perf_counter() - started) * 1000, 1),
+        'warmup_ms': None
+    }
+    print(f"App created in {app.config['STARTUP_REPORT']['create_app_ms']}ms "
+          f"(imports {app.config['STARTUP_REPORT']['import_ms']}ms)")
+
+    if app.config['WARMUP_ON_START']:
+        from .utils.clients import warm_up
+        warm_up(app)
+
     return app
 
 # Create the application instance
@@ -1,60 +1,41 @@
 from flask import Blueprint, request, jsonify, current_app, abort, send_file
 import os
 from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta
-from PyPDF2 import PdfReader
-import glob
+from datetime import datetime
 import hashlib
+import tempfile
 from pathlib import Path
 import json
+from ..utils.content_index import PAGE_SEPARATOR, content_paths, write_content, read_pages, page_count
+from ..utils.compression import write_precompressed, send_precompressed
+from ..utils.janitor import get_janitor
+from ..utils.extraction import extract_pages
+from ..utils.state import get_store, resolve_document
+from ..utils.atomic import atomic_open
+from ..utils.outline import detect_outline
+from ..utils.normalize import normalize_pages, token_savings
+from ..utils.clients import count_tokens
+from ..utils import vector_index
 
 bp = Blueprint('pdf', __name__, url_prefix='/api/pdf')
 
 ALLOWED_EXTENSIONS = {'pdf'}
-TEMP_FILE_MAX_AGE = timedelta(hours=1)  # Clean files older than 1 hour
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB limit
+MAX_PAGES_PER_REQUEST = 50  # Upper bound for one page-range content request
+MAX_SEARCH_RESULTS = 20
+HASHED_URL_MAX_AGE = 365 * 24 * 60 * 60  # URLs carrying ?v=<sha256> never change
 
-def is_file_old(filepath):
-    """Check if a file is older than TEMP_FILE_MAX_AGE"""
-    if not os.path.exists(filepath):
-        return False
-    
-    file_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-    return datetime.now() - file_time > TEMP_FILE_MAX_AGE
-
-def cleanup_old_files(force=False):
-    """Clean up old files from the uploads directory
-    Args:
-        force (bool): If True, remove all files regardless of age
-    """
-    upload_folder = current_app.config['UPLOAD_FOLDER']
-    
-    # Clean up old PDFs - only if force=True since these are main content
-    if force:
-        pdf_files = glob.glob(os.path.join(upload_folder, '*.pdf'))
-        for pdf in pdf_files:
-            try:
-                os.remove(pdf)
-            except Exception as e:
-                print(f"Error removing PDF {pdf}: {e}")
-        
-        # Clean up metadata files
-        metadata_files = glob.glob(os.path.join(upload_folder, '*_metadata.json'))
-        content_files = glob.glob(os.path.join(upload_folder, '*_content.txt'))
-        for file in metadata_files + content_files:
-            try:
-                os.remove(file)
-            except Exception as e:
-                print(f"Error removing metadata file {file}: {e}")
-    
-    # Always clean up old temporary audio files
-    temp_files = glob.glob(os.path.join(upload_folder, 'temp_audio_*.mp3'))
-    for temp in temp_files:
-        if force or is_file_old(temp):
-            try:
-                os.remove(temp)
-            except Exception as e:
-                print(f"Error removing temp file {temp}: {e}")
+def load_metadata(filename):
+    """Load the stored metadata for an uploaded PDF, or None if missing"""
+    metadata_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{filename}_metadata.json")
+    if not os.path.exists(metadata_path):
+        return None
+    try:
+        with open(metadata_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading metadata {metadata_path}: {e}")
+        return None
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -72,8 +53,11 @@ def secure_check_file(file):
     if not file.filename.lower().endswith('.pdf'):
         return False, "Invalid file type - must be PDF"
 
-    # Save to temporary file for validation
-    temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp_check.pdf')
+    from PyPDF2 import PdfReader
+
+    # Save to a unique temporary file for validation (concurrent uploads must not collide)
+    fd, temp_path = tempfile.mkstemp(dir=current_app.config['UPLOAD_FOLDER'], prefix='.check_', suffix='.pdf')
+    os.close(fd)
     try:
         file.save(temp_path)
         reader = PdfReader(temp_path)
@@ -90,6 +74,8 @@ def secure_check_file(file):
 @bp.route('/upload', methods=['POST'])
 def upload_pdf():
     """Handle PDF file upload with security checks"""
+    from PyPDF2 import PdfReader
+
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
     
@@ -102,34 +88,61 @@ def upload_pdf():
     if not is_safe:
         return jsonify({'error': error_message}), 400
 
-    # Clean up ALL old files before uploading new one
-    cleanup_old_files(force=True)
-    
-    # Use a fixed filename
-    filename = 'current.pdf'
-    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    fd, temp_path = tempfile.mkstemp(dir=upload_folder, prefix='.upload_', suffix='.pdf')
+    os.close(fd)
+    filepath = None
     
     try:
-        # Save the file
-        file.save(filepath)
-        
-        # Verify the saved file
-        if not os.path.exists(filepath):
-            return jsonify({'error': 'File save failed'}), 500
+        # Save the file under a unique temporary name
+        file.save(temp_path)
         
-        # Update the current PDF path in app config
-        current_app.config['CURRENT_PDF'] = filepath
+        # Calculate file hash for integrity; it also names the stored document
+        file_hash = hashlib.sha256()
+        with open(temp_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(4096), b''):
+                file_hash.update(chunk)
+
+        # Content-addressed filename: concurrent uploads never share files,
+        # and identical uploads resolve to the same document
+        filename = f"{file_hash.hexdigest()[:16]}.pdf"
+        filepath = os.path.join(upload_folder, filename)
+        os.replace(temp_path, filepath)
         
-        # Extract text content and save it
+        # Extract text content with the configured backend chain and save it with a page offset index
         reader = PdfReader(filepath)
-        text_content = ""
-        for page in reader.pages:
-            text_content += page.extract_text() + "\n\n"
-        
-        # Save text content
-        text_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{filename}_content.txt")
-        with open(text_path, 'w', encoding='utf-8') as f:
-            f.write(text_content)
+        extraction = extract_pages(filepath, current_app.config['PDF_EXTRACTION_BACKENDS'])
+        pages = extraction['pages']
+
+        # Normalize once so every downstream prompt is built from smaller text
+        normalization = None
+        raw_paths = []
+        if current_app.config['NORMALIZE_TEXT']:
+            raw_pages = pages
+            # Keep the extracted text as-is so it can be re-normalized or compared later
+            raw_paths = list(content_paths(current_app.config['UPLOAD_FOLDER'], f"{filename}_raw"))
+            write_content(*raw_paths, raw_pages)
+            pages, normalization = normalize_pages(raw_pages)
+            # The savings report needs the tokenizer; ingestion must not
+            try:
+                normalization.update(token_savings(raw_pages, pages, count_tokens))
+                print(f"Normalization saved {normalization['tokens_saved']} tokens "
+                      f"({normalization['percent_saved']}%)")
+            except Exception as e:
+                print(f"Could not count normalization token savings: {str(e)}")
+        text_path, index_path = content_paths(current_app.config['UPLOAD_FOLDER'], filename)
+        write_content(text_path, index_path, pages)
+        text_variants = write_precompressed(text_path)
+
+        # Embed page passages for semantic lookup; Q&A falls back to page windows without it
+        vector_info = None
+        vector_paths = vector_index.index_paths(current_app.config['UPLOAD_FOLDER'], filename)
+        if current_app.config['VECTOR_INDEX']:
+            try:
+                vector_info = vector_index.build_index(vector_paths, pages, current_app.config['EMBEDDER'])
+                print(f"Vector index: {vector_info['passages']} passages ({vector_info['embedder']})")
+            except Exception as e:
+                print(f"Error building vector index: {str(e)}")
         
         # Extract TOC if available
         toc = []
@@ -174,12 +187,20 @@ def upload_pdf():
         except Exception as e:
             print(f"Error extracting TOC: {str(e)}")
             # Continue even if TOC extraction fails
-        
-        # Calculate file hash for integrity
-        file_hash = hashlib.sha256()
-        with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
-                file_hash.update(chunk)
+
+        # No bookmarks: infer headings locally from font size, weight and numbering
+        toc_source = 'outline' if toc else 'detected'
+        if not toc:
+            try:
+                toc = detect_outline(filepath)
+            except Exception as e:
+                print(f"Error detecting outline: {str(e)}")
+                toc_source = None
+
+        toc_path = os.path.join(upload_folder, f"{filename}_toc.json")
+        with atomic_open(toc_path, 'w', encoding='utf-8') as f:
+            json.dump({'toc': toc}, f)
+        toc_variants = write_precompressed(toc_path)
         
         # Save metadata
         metadata = {
@@ -188,12 +209,37 @@ def upload_pdf():
             'upload_date': datetime.now().isoformat(),
             'hash': file_hash.hexdigest(),
             'page_count': len(reader.pages),
-            'has_toc': bool(toc)
+            'has_toc': bool(toc),
+            'toc_source': toc_source if toc else None,
+            'normalization': normalization,
+            'vector_index': vector_info,
+            'extraction': {
+                'backend': extraction['backend'],
+                'attempts': extraction['attempts']
+            }
         }
         
         metadata_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{filename}_metadata.json")
-        with open(metadata_path, 'w') as f:
+        with atomic_open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2)
+
+        # Pre-render the full content response so it is served without per-request work
+        payload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{filename}_content.json")
+        with atomic_open(payload_path, 'w', encoding='utf-8') as f:
+            json.dump({'content': ''.join(page + PAGE_SEPARATOR for page in pages), 'metadata': metadata}, f)
+        payload_variants = write_precompressed(payload_path)
+
+        # Register the new artifacts with the janitor and keep them from eviction
+        janitor = get_janitor()
+        janitor.track(
+            [filepath, text_path, index_path, metadata_path, payload_path, toc_path]
+            + text_variants + payload_variants + toc_variants + raw_paths
+            + ([vector_paths['vectors'], vector_paths['pages'], vector_paths['info']] if vector_info else []),
+            group=filename
+        )
+
+        # Publish the new document to every worker only once its artifacts are complete
+        get_store().set_current_document(filename)
                 
         return jsonify({
             'message': 'File uploaded successfully',
@@ -204,8 +250,10 @@ def upload_pdf():
         }), 200
         
     except Exception as e:
-        # Clean up on error
-        if os.path.exists(filepath):
+        # Clean up on error (a PDF with metadata may belong to an identical earlier upload)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if filepath and os.path.exists(filepath) and load_metadata(os.path.basename(filepath)) is None:
             os.remove(filepath)
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
@@ -225,16 +273,21 @@ def list_pdfs():
 @bp.route('/<filename>', methods=['GET'])
 def get_pdf_content(filename):
     # If no specific filename is provided or it's "current", use the current PDF
-    if filename in ['current', 'current.pdf']:
-        if not current_app.config.get('CURRENT_PDF'):
-            return jsonify({'error': 'No PDF currently loaded'}), 404
-        filename = 'current.pdf'
+    filename = resolve_document(filename)
+    if filename is None:
+        return jsonify({'error': 'No PDF currently loaded'}), 404
     
     text_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{filename}_content.txt")
     metadata_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{filename}_metadata.json")
     
     if not os.path.exists(text_path) or not os.path.exists(metadata_path):
         return jsonify({'error': 'PDF content not found'}), 404
+
+    # Serve the pre-rendered (and precompressed) payload written at upload
+    payload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{filename}_content.json")
+    get_janitor().touch(filename)
+    if os.path.exists(payload_path):
+        return send_precompressed(payload_path, 'application/json')
         
     try:
         with open(text_path, 'r', encoding='utf-8') as f:
@@ -251,33 +304,133 @@ def get_pdf_content(filename):
         print(f"Error reading PDF content: {str(e)}")
         return jsonify({'error': 'Failed to read PDF content'}), 500
 
+@bp.route('/<filename>/text', methods=['GET'])
+def get_pdf_text(filename):
+    """Serve the extracted plain text artifact, precompressed where possible"""
+    filename = resolve_document(filename)
+    if filename is None:
+        return jsonify({'error': 'No PDF currently loaded'}), 404
+
+    text_path, _ = content_paths(current_app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(text_path):
+        return jsonify({'error': 'PDF content not found'}), 404
+
+    get_janitor().touch(filename)
+    return send_precompressed(text_path, 'text/plain; charset=utf-8')
+
+@bp.route('/<filename>/pages', methods=['GET'])
+def get_pdf_pages(filename):
+    """Return the text of a page range, e.g. /api/pdf/current/pages?start=3&end=5"""
+    filename = resolve_document(filename)
+    if filename is None:
+        return jsonify({'error': 'No PDF currently loaded'}), 404
+
+    text_path, index_path = content_paths(current_app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(text_path) or not os.path.exists(index_path):
+        return jsonify({'error': 'PDF content not found'}), 404
+
+    total_pages = page_count(index_path)
+    start = request.args.get('start', 1, type=int)
+    end = request.args.get('end', start, type=int)
+    if start < 1 or end < start or end > total_pages:
+        return jsonify({'error': f'Invalid page range. The document has {total_pages} pages.'}), 400
+    if end - start + 1 > MAX_PAGES_PER_REQUEST:
+        return jsonify({'error': f'At most {MAX_PAGES_PER_REQUEST} pages can be requested at once'}), 400
+
+    try:
+        get_janitor().touch(filename)
+        texts = read_pages(text_path, index_path, start, end)
+        return jsonify({
+            'pages': [
+                {'pageNumber': start + i, 'text': text}
+                for i, text in enumerate(texts)
+            ],
+            'start': start,
+            'end': end,
+            'page_count': total_pages
+        }), 200
+    except Exception as e:
+        print(f"Error reading PDF pages: {str(e)}")
+        return jsonify({'error': 'Failed to read PDF content'}), 500
+
+@bp.route('/<filename>/search', methods=['GET'])
+def search_pdf(filename):
+    """Pages most similar to a query, e.g. /api/pdf/current/search?q=entropy&k=5"""
+    filename = resolve_document(filename)
+    if filename is None:
+        return jsonify({'error': 'No PDF currently loaded'}), 404
+
+    query = request.args.get('q', '').strip()
+    k = request.args.get('k', 5, type=int)
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    if k < 1 or k > MAX_SEARCH_RESULTS:
+        return jsonify({'error': f'k must be between 1 and {MAX_SEARCH_RESULTS}'}), 400
+
+    paths = vector_index.index_paths(current_app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.exists(paths['info']):
+        return jsonify({'error': 'No vector index for this PDF'}), 404
+
+    try:
+        get_janitor().touch(filename)
+        return jsonify({'query': query, 'results': vector_index.search(paths, query, k)}), 200
+    except Exception as e:
+        print(f"Error searching PDF: {str(e)}")
+        return jsonify({'error': 'Failed to search PDF'}), 500
+
 @bp.route('/cleanup', methods=['POST'])
 def trigger_cleanup():
-    """Endpoint to manually trigger cleanup of old files"""
+    """Run the storage janitor now; ?force=true removes every tracked artifact"""
     try:
-        cleanup_old_files(force=True)  # Clean everything
-        return jsonify({'message': 'Cleanup completed successfully'}), 200
+        janitor = get_janitor()
+        if request.args.get('force', '').lower() == 'true':
+            result = janitor.purge()
+        else:
+            result = janitor.sweep()
+        return jsonify({'message': 'Cleanup completed successfully', **result, 'usage_bytes': janitor.usage()}), 200
     except Exception as e:
         print(f"Cleanup error: {str(e)}")  # Log the error
         return jsonify({'error': f'Cleanup failed: {str(e)}'}), 500
 
 @bp.route('/file/<filename>', methods=['GET'])
 def serve_pdf(filename):
-    """Serve the PDF file directly"""
-    if filename == 'current.pdf' and not current_app.config.get('CURRENT_PDF'):
+    """Serve the PDF file with range, ETag and conditional GET support
+
+    PDF.js fetches pages incrementally with byte-range requests. The strong
+    ETag is the SHA-256 stored at upload, so reloads revalidate with a 304.
+    Requests made with ``?v=<sha256>`` are immutable and cached long-term.
+    """
+    filename = resolve_document(filename)
+    if filename is None:
         return jsonify({'error': 'No PDF currently loaded'}), 404
         
+    # Only uploaded documents: the folder also holds state.db and derived artifacts
     filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-    if not os.path.exists(filepath):
+    metadata = load_metadata(filename) if allowed_file(filename) else None
+    if metadata is None or not os.path.exists(filepath):
         return jsonify({'error': 'PDF file not found'}), 404
+
+    file_hash = metadata.get('hash')
+    get_janitor().touch(filename)
         
     try:
-        return send_file(
+        # conditional=True makes werkzeug answer Range (206) and If-None-Match (304)
+        response = send_file(
             filepath,
             mimetype='application/pdf',
             as_attachment=False,
-            download_name=filename
+            download_name=filename,
+            conditional=True,
+            etag=file_hash or True
         )
+        if file_hash and request.args.get('v') == file_hash:
+            response.headers['Cache-Control'] = f'public, max-age={HASHED_URL_MAX_AGE}, immutable'
+        else:
+            # Unversioned URLs can change on the next upload: always revalidate
+            response.headers['Cache-Control'] = 'no-cache'
+        # Werkzeug only sends this on 206; PDF.js needs it on the first response to use ranges
+        response.headers['Accept-Ranges'] = 'bytes'
+        return response
     except Exception as e:
         print(f"Error serving PDF: {str(e)}")
-        return jsonify({'error': 'Failed to serve PDF'}), 500 
\ No newline at end of file
+        return jsonify({'error': 'Failed to serve PDF'}), 500
@@ -1,33 +1,38 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 import os
 import json
-from openai import OpenAI, RateLimitError
-import tiktoken
 from datetime import datetime
-from PyPDF2 import PdfReader
-import openai
-from dotenv import load_dotenv
-
-load_dotenv()
-openai.api_key = os.getenv('OPENAI_API_KEY')
+from ..utils.clients import get_openai_client, create_chat_completion, count_tokens, is_rate_limit_error
+from ..utils.content_index import content_paths, read_pages, page_count
+from ..utils.admission import admission_controlled
+from ..utils.state import get_store, get_current_pdf, resolve_document
+from ..utils.compression import send_precompressed
+from ..utils.outline import detect_outline
+from ..utils import vector_index
 
 bp = Blueprint('qa', __name__, url_prefix='/api/qa')
 
-def get_openai_client():
-    """Create a new OpenAI client instance"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    # Print masked version of API key for debugging
-    if api_key:
-        masked_key = f"{api_key[:8]}...{api_key[-4:]}"
-        print(f"Using API key: {masked_key}")
-    else:
-        print("Warning: No API key found!")
-    return OpenAI(api_key=api_key)
-
-def count_tokens(text: str) -> int:
-    """Count tokens in text using tiktoken"""
-    encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-    return len(encoding.encode(text))
+def get_page_texts(pdf_path: str, start: int, end: int) -> list:
+    """Return text for 1-based pages start..end from the ingestion index
+
+    Falls back to extracting with PyPDF2 for PDFs uploaded without an index.
+    """
+    text_path, index_path = content_paths(os.path.dirname(pdf_path), os.path.basename(pdf_path))
+    if os.path.exists(text_path) and os.path.exists(index_path):
+        return read_pages(text_path, index_path, start, end)
+
+    from PyPDF2 import PdfReader
+    reader = PdfReader(pdf_path)
+    return [reader.pages[i].extract_text() for i in range(start - 1, end)]
+
+def get_page_count(pdf_path: str) -> int:
+    """Number of pages in the PDF, from the ingestion index when available"""
+    _, index_path = content_paths(os.path.dirname(pdf_path), os.path.basename(pdf_path))
+    if os.path.exists(index_path):
+        return page_count(index_path)
+
+    from PyPDF2 import PdfReader
+    return len(PdfReader(pdf_path).pages)
 
 def chunk_text(text: str, max_tokens: int = 2000) -> list:
     """Split text into chunks that fit within token limits"""
@@ -55,7 +60,138 @@ def chunk_text(text: str, max_tokens: int = 2000) -> list:
     
     return chunks
 
+QA_SYSTEM_MESSAGE = """You are a helpful assistant that answers questions about the content of a book. 
+Your responses should be clear and well-structured. When writing:
+- Use bullet points for key points
+- Keep paragraphs short and focused
+- Use sections with headers when appropriate
+- Highlight important concepts
+- Keep responses concise yet informative
+- For mathematical expressions, use LaTeX with proper delimiters:
+  * For inline math, use $...$ (e.g., $x^2$)
+  * For display math, use $$...$$ (e.g., $$\\int x dx = \\frac{1}{2}x^2 + C$$)
+Base your answers only on the provided text. If you cannot find relevant information in the text, say so clearly."""
+
+MAX_BATCH_QUESTIONS = 100
+MIN_SEMANTIC_SCORE = 0.1  # Cosine similarity below this is treated as unrelated
+
+def get_chapter_starts(pdf_path: str) -> list:
+    """1-based start pages of the top-level TOC entries, in page order
+
+    Read from the TOC written at upload (bookmarks or the locally detected
+    outline); falls back to the PDF's bookmarks for older uploads.
+    """
+    toc_path = f"{pdf_path}_toc.json"
+    if os.path.exists(toc_path):
+        with open(toc_path, 'r', encoding='utf-8') as f:
+            toc = json.load(f).get('toc', [])
+        return sorted({item['pageNumber'] for item in toc if item.get('pageNumber')})
+
+    from PyPDF2 import PdfReader
+    reader = PdfReader(pdf_path)
+    starts = []
+    if hasattr(reader, 'outline') and reader.outline:
+        for item in reader.outline:
+            if isinstance(item, dict):
+                starts.append(reader.get_destination_page_number(item) + 1)
+    return starts
+
+def is_chapter_question(question: str) -> bool:
+    return 'chapter' in question.lower()
+
+def related_pages(pdf_path: str, question: str, start_page: int, end_page: int) -> tuple:
+    """Pages outside start..end whose passages best match the question
+
+    Uses the vector index written at upload; returns () when there is none.
+    """
+    top_k = current_app.config['SEMANTIC_TOP_K']
+    paths = vector_index.index_paths(os.path.dirname(pdf_path), os.path.basename(pdf_path))
+    if top_k < 1 or not os.path.exists(paths['info']):
+        return ()
+    try:
+        # Ask for extra hits since the page window itself often ranks highest
+        results = vector_index.search(paths, question, top_k + end_page - start_page + 1)
+    except Exception as e:
+        print(f"Error searching vector index: {str(e)}")
+        return ()
+    pages = [r['pageNumber'] for r in results
+             if r['score'] >= MIN_SEMANTIC_SCORE and not start_page <= r['pageNumber'] <= end_page]
+    return tuple(sorted(pages[:top_k]))
+
+def resolve_page_context(question: str, page: int, total_pages: int, chapter_starts: list):
+    """Pick the pages a question should be answered from
+
+    Chapter questions use the whole chapter around the page, everything else
+    uses the page and its neighbours. Returns (start_page, end_page, context).
+    """
+    if is_chapter_question(question):
+        # Find chapter boundaries from TOC
+        chapter_start = 1
+        chapter_end = page
+        next_chapter_start = total_pages + 1
+
+        if chapter_starts:
+            for item_page in chapter_starts:
+                if item_page <= page:
+                    chapter_start = item_page
+                elif item_page > page:
+                    next_chapter_start = item_page
+                    break
+            chapter_end = next_chapter_start - 1
+
+        return chapter_start, chapter_end, f"text from Chapter pages {chapter_start} to {chapter_end}"
+
+    # For non-chapter queries, use current page and neighbors
+    start_page = max(1, page - 1)
+    end_page = min(total_pages, page + 1)
+    return start_page, end_page, f"text from pages {start_page} to {end_page}"
+
+def add_related_pages(pdf_path: str, questions: list, start_page: int, end_page: int, context: str):
+    """Extend a page-window context with the pages most similar to its questions
+
+    Chapter contexts already span the whole chapter and are left as they are.
+    Returns (extra_pages, context).
+    """
+    if any(is_chapter_question(question) for question in questions):
+        return (), context
+    extra_pages = related_pages(pdf_path, ' '.join(dict.fromkeys(questions)), start_page, end_page)
+    if extra_pages:
+        context += f" and related pages {', '.join(str(p) for p in extra_pages)}"
+    return extra_pages, context
+
+def build_context_text(pdf_path: str, start_page: int, end_page: int, extra_pages: tuple = ()) -> str:
+    """Concatenate page texts with page markers for the prompt"""
+    text = ""
+    for page_num, page_text in enumerate(get_page_texts(pdf_path, start_page, end_page), start=start_page):
+        text += f"\n\n=== Page {page_num} ===\n\n"
+        text += page_text
+    for page_num in extra_pages:
+        text += f"\n\n=== Page {page_num} ===\n\n"
+        text += get_page_texts(pdf_path, page_num, page_num)[0]
+    return text
+
+def answer_from_chunks(client, context: str, chunks: list, question: str) -> str:
+    """Ask the model about each chunk and combine the answers"""
+    all_responses = []
+    for i, chunk in enumerate(chunks):
+        print(f"Processing chunk {i + 1}")
+        response = create_chat_completion(
+            client,
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": QA_SYSTEM_MESSAGE},
+                {"role": "user", "content": f"Here is the {context}:\n\n{chunk}\n\nQuestion: {question}"}
+            ],
+            max_tokens=500
+        )
+        all_responses.append(response.choices[0].message.content)
+        print(f"Got response for chunk {i + 1}")
+
+    # Combine responses if there were multiple chunks
+    return "\n\n".join(all_responses)
+
 @bp.route('/ask', methods=['POST'])
+@admission_controlled
 def ask_question():
     try:
         data = request.get_json()
@@ -66,94 +202,30 @@ def ask_question():
         page = data.get('page', 1)
         
         # Get the PDF path from app config
-        pdf_path = current_app.config.get('CURRENT_PDF')
-        if not pdf_path or not os.path.exists(pdf_path):
+        pdf_path = get_current_pdf()
+        if not pdf_path:
             return jsonify({'error': 'Please upload a PDF file first'}), 404
 
         print(f"Using PDF file: {pdf_path}")
         print(f"Question: {question}")
         print(f"Page: {page}")
 
-        reader = PdfReader(pdf_path)
-        if page < 1 or page > len(reader.pages):
-            return jsonify({'error': f'Invalid page number. The document has {len(reader.pages)} pages.'}), 400
+        total_pages = get_page_count(pdf_path)
+        if page < 1 or page > total_pages:
+            return jsonify({'error': f'Invalid page number. The document has {total_pages} pages.'}), 400
 
-        # If asking about a chapter, find chapter boundaries
-        is_chapter_query = 'chapter' in question.lower()
-        text = ""
-        
-        if is_chapter_query:
-            # Find chapter boundaries from TOC
-            chapter_start = 1
-            chapter_end = page
-            next_chapter_start = len(reader.pages)
-            
-            if hasattr(reader, 'outline') and reader.outline:
-                for item in reader.outline:
-                    if isinstance(item, dict):
-                        item_page = reader.get_destination_page_number(item) + 1
-                        if item_page <= page:
-                            chapter_start = item_page
-                        elif item_page > page:
-                            next_chapter_start = item_page
-                            break
-                chapter_end = next_chapter_start - 1
-            
-            # Extract text from the entire chapter
-            for page_num in range(chapter_start - 1, chapter_end):
-                current_page = reader.pages[page_num]
-                text += f"\n\n=== Page {page_num + 1} ===\n\n"
-                text += current_page.extract_text()
-                
-            context = f"text from Chapter pages {chapter_start} to {chapter_end}"
-        else:
-            # For non-chapter queries, use current page and neighbors
-            start_page = max(1, page - 1)
-            end_page = min(len(reader.pages), page + 1)
-            
-            for page_num in range(start_page - 1, end_page):
-                current_page = reader.pages[page_num]
-                text += f"\n\n=== Page {page_num + 1} ===\n\n"
-                text += current_page.extract_text()
-                
-            context = f"text from pages {start_page} to {end_page}"
+        start_page, end_page, context = resolve_page_context(
+            question, page, total_pages, get_chapter_starts(pdf_path)
+        )
+        extra_pages, context = add_related_pages(pdf_path, [question], start_page, end_page, context)
+        text = build_context_text(pdf_path, start_page, end_page, extra_pages)
 
         print(f"Extracted text length: {len(text)}")
         print(f"Context: {context}")
 
         # Split text into chunks if it's too long
         chunks = chunk_text(text)
-        all_responses = []
-
-        # Update the system message in the ask_question route
-        system_message = """You are a helpful assistant that answers questions about the content of a book. 
-Your responses should be clear and well-structured. When writing:
-- Use bullet points for key points
-- Keep paragraphs short and focused
-- Use sections with headers when appropriate
-- Highlight important concepts
-- Keep responses concise yet informative
-- For mathematical expressions, use LaTeX with proper delimiters:
-  * For inline math, use $...$ (e.g., $x^2$)
-  * For display math, use $$...$$ (e.g., $$\\int x dx = \\frac{1}{2}x^2 + C$$)
-Base your answers only on the provided text. If you cannot find relevant information in the text, say so clearly."""
-
-        # Process each chunk with OpenAI
-        for i, chunk in enumerate(chunks):
-            print(f"Processing chunk {i + 1}")
-            response = get_openai_client().chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": f"Here is the {context}:\n\n{chunk}\n\nQuestion: {question}"}
-                ],
-                max_tokens=500
-            )
-            all_responses.append(response.choices[0].message.content)
-            print(f"Got response for chunk {i + 1}")
-
-        # Combine responses if there were multiple chunks
-        final_answer = "\n\n".join(all_responses)
+        final_answer = answer_from_chunks(get_openai_client(), context, chunks, question)
         print("Final answer length:", len(final_answer))
         return jsonify({'answer': final_answer}), 200
 
@@ -161,17 +233,102 @@ Base your answers only on the provided text. If you cannot find relevant informa
         print(f"Error in ask_question: {str(e)}")
         return jsonify({'error': 'Error processing request. Please make sure a PDF is uploaded and try again.'}), 500
 
+@bp.route('/batch', methods=['POST'])
+@admission_controlled
+def ask_batch():
+    """Answer many questions over the current PDF, streamed as JSON lines
+
+    Body: {"questions": [{"question": "...", "page": 3}, "..."], "page": 1}
+    Plain string questions use the top-level page. Questions sharing the same
+    page context are grouped so each context is extracted and tokenized once;
+    model calls run concurrently (QA_BATCH_CONCURRENCY) and each answer is
+    written as one JSON line as soon as it completes, in completion order.
+    """
+    data = request.get_json()
+    if not data or not isinstance(data.get('questions'), list) or not data['questions']:
+        return jsonify({'error': 'No questions provided'}), 400
+    if len(data['questions']) > MAX_BATCH_QUESTIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_QUESTIONS} questions per batch'}), 400
+
+    pdf_path = get_current_pdf()
+    if not pdf_path:
+        return jsonify({'error': 'Please upload a PDF file first'}), 404
+
+    total_pages = get_page_count(pdf_path)
+    chapter_starts = get_chapter_starts(pdf_path)
+    default_page = data.get('page', 1)
+
+    # Group questions by the page context they need
+    items = []
+    groups = {}
+    for index, entry in enumerate(data['questions']):
+        if isinstance(entry, str):
+            entry = {'question': entry}
+        if not isinstance(entry, dict) or not entry.get('question'):
+            return jsonify({'error': f'Question {index} is missing its text'}), 400
+        page = entry.get('page', default_page)
+        if not isinstance(page, int) or page < 1 or page > total_pages:
+            return jsonify({'error': f'Invalid page number for question {index}. The document has {total_pages} pages.'}), 400
+        key = resolve_page_context(entry['question'], page, total_pages, chapter_starts)
+        groups.setdefault(key, []).append(len(items))
+        items.append({'index': index, 'question': entry['question'], 'page': page})
+
+    print(f"Batch of {len(items)} questions over {len(groups)} page contexts")
+
+    # Extract and tokenize each shared context once, adding the pages related to the group's questions
+    group_contexts = {}
+    for key, item_ids in groups.items():
+        questions = [items[item_id]['question'] for item_id in item_ids]
+        extra_pages, context = add_related_pages(pdf_path, questions, key[0], key[1], key[2])
+        group_contexts[key] = (context, chunk_text(build_context_text(pdf_path, key[0], key[1], extra_pages)))
+
+    client = get_openai_client()
+    concurrency = current_app.config['QA_BATCH_CONCURRENCY']
+    app = current_app._get_current_object()
+
+    def answer_in_app_context(context, chunks, question):
+        # Worker threads need their own app context for config lookups
+        with app.app_context():
+            return answer_from_chunks(client, context, chunks, question)
+
+    def generate():
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            futures = {}
+            for key, item_ids in groups.items():
+                for item_id in item_ids:
+                    item = items[item_id]
+                    future = executor.submit(answer_in_app_context, *group_contexts[key], item['question'])
+                    futures[future] = item
+
+            failed = 0
+            for future in as_completed(futures):
+                item = futures[future]
+                result = {'index': item['index'], 'question': item['question'], 'page': item['page']}
+                try:
+                    result['answer'] = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"Error answering batch question {item['index']}: {str(e)}")
+                    if is_rate_limit_error(e):
+                        result['error'] = 'Rate limit exceeded. Please try again in a moment.'
+                    else:
+                        result['error'] = 'Failed to get response from AI model.'
+                yield json.dumps(result) + "\n"
+
+            yield json.dumps({'done': True, 'answered': len(items) - failed, 'failed': failed}) + "\n"
+        finally:
+            # Stop queued work if the client disconnects mid-stream
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @bp.route('/history/<filename>', methods=['GET'])
 def get_qa_history(filename):
     """Get Q&A history for a specific PDF"""
-    history_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{filename}_qa_history.json")
-    
-    if not os.path.exists(history_path):
-        return jsonify({'history': []}), 200
-        
-    with open(history_path, 'r') as f:
-        history = json.load(f)
-        
+    history = get_store().history(resolve_document(filename) or filename)
     return jsonify({'history': history}), 200
 
 @bp.route('/save_interaction', methods=['POST'])
@@ -180,27 +337,10 @@ def save_interaction():
     data = request.json
     if not data or 'question' not in data or 'answer' not in data or 'filename' not in data:
         return jsonify({'error': 'Missing required fields'}), 400
-        
-    filename = data['filename']
-    history_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{filename}_qa_history.json")
-    
-    # Load existing history or create new
-    if os.path.exists(history_path):
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-    else:
-        history = []
-    
-    # Add new interaction
-    history.append({
-        'question': data['question'],
-        'answer': data['answer'],
-        'timestamp': datetime.now().isoformat()
-    })
-    
-    # Save updated history
-    with open(history_path, 'w') as f:
-        json.dump(history, f)
+
+    # Stored in the shared state database so every worker sees the same history
+    filename = resolve_document(data['filename']) or data['filename']
+    get_store().add_interaction(filename, data['question'], data['answer'], datetime.now().isoformat())
         
     return jsonify({'message': 'Interaction saved successfully'}), 200
 
@@ -218,84 +358,23 @@ def list_models():
 
 @bp.route('/upload', methods=['POST'])
 def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    
-    if file and file.filename.endswith('.pdf'):
-        # Save with a unique filename
-        filename = os.path.join(current_app.config['UPLOAD_FOLDER'], 'current.pdf')
-        
-        # Save the file
-        file.save(filename)
-        
-        # Update the current PDF path in app config
-        current_app.config['CURRENT_PDF'] = filename
-        
-        # Extract table of contents if available
-        try:
-            reader = PdfReader(filename)
-            toc = []
-            if hasattr(reader, 'outline') and reader.outline:
-                def extract_bookmarks(bookmarks, level=0):
-                    items = []
-                    for bookmark in bookmarks:
-                        if isinstance(bookmark, dict):
-                            item = {}
-                            if '/Title' in bookmark:
-                                item['title'] = bookmark['/Title']
-                            if '/Page' in bookmark:
-                                item['pageNumber'] = reader.get_destination_page_number(bookmark) + 1
-                            item['level'] = level
-                            
-                            # Handle nested bookmarks
-                            if '/First' in bookmark:
-                                # Get all children
-                                current_child = bookmark['/First']
-                                while current_child:
-                                    child_items = extract_bookmarks([current_child], level + 1)
-                                    if child_items:
-                                        item['children'].extend(child_items)
-                                    if '/Next' in current_child:
-                                        current_child = current_child['/Next']
-                                    else:
-                                        break
-                            
-                            items.append(item)
-                            
-                            # Process next sibling if it exists
-                            if '/Next' in bookmark:
-                                next_items = extract_bookmarks([bookmark['/Next']], level)
-                                items.extend(next_items)
-                                
-                        elif isinstance(bookmark, list):
-                            items.extend(extract_bookmarks(bookmark, level))
-                    return items
-                
-                toc = extract_bookmarks(reader.outline)
-            
-            return jsonify({
-                'message': 'File uploaded successfully',
-                'filename': os.path.basename(filename),
-                'toc': toc
-            }), 200
-            
-        except Exception as e:
-            print(f"Error processing PDF: {str(e)}")
-            return jsonify({'error': 'Error processing PDF file'}), 500
-    else:
-        return jsonify({'error': 'Invalid file type. Please upload a PDF file.'}), 400
+    """Legacy upload endpoint; shares the PDF blueprint's ingestion path"""
+    from .pdf_routes import upload_pdf
+    return upload_pdf()
 
 @bp.route('/get-toc', methods=['GET'])
 def get_table_of_contents():
     try:
-        filename = os.path.join(current_app.config['UPLOAD_FOLDER'], 'current.pdf')
-        if not os.path.exists(filename):
+        from PyPDF2 import PdfReader
+        filename = get_current_pdf()
+        if not filename:
             return jsonify({'error': 'No PDF file uploaded'}), 404
 
+        # Serve the TOC built once at ingestion
+        toc_path = f"{filename}_toc.json"
+        if os.path.exists(toc_path):
+            return send_precompressed(toc_path, 'application/json')
+
         reader = PdfReader(filename)
         
         def extract_bookmarks(bookmarks, level=0):
@@ -325,59 +404,9 @@ def get_table_of_contents():
         if hasattr(reader, 'outline') and reader.outline:
             toc = extract_bookmarks(reader.outline)
         
-        # If no TOC in metadata, try to extract from content
+        # If no TOC in metadata, infer headings locally from the page layout
         if not toc:
-            # Use OpenAI to analyze the first page for potential TOC
-            first_page = reader.pages[0]
-            text = first_page.extract_text()
-            
-            response = get_openai_client().chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that extracts hierarchical table of contents information from text. Return the information with proper indentation levels and page numbers."},
-                    {"role": "user", "content": f"Extract the hierarchical table of contents from this text, if present. Use indentation to show hierarchy:\n\n{text}"}
-                ],
-                max_tokens=500
-            )
-            
-            # Process the AI response to extract hierarchical TOC
-            ai_response = response.choices[0].message.content
-            lines = ai_response.split('\n')
-            current_level = 0
-            stack = [{'children': toc}]  # Root level
-            
-            for line in lines:
-                if not line.strip():
-                    continue
-                    
-                # Count leading spaces to determine level
-                spaces = len(line) - len(line.lstrip())
-                level = spaces // 2  # Assume 2 spaces per level
-                
-                # Extract title and page number
-                parts = line.strip().split('.')
-                if len(parts) >= 2 and parts[-1].strip().isdigit():
-                    title = '.'.join(parts[:-1]).strip()
-                    page_num = int(parts[-1].strip())
-                    
-                    # Create TOC item
-                    item = {
-                        'title': title,
-                        'pageNumber': page_num,
-                        'level': level,
-                        'children': []
-                    }
-                    
-                    # Adjust stack for current level
-                    while len(stack) > level + 1:
-                        stack.pop()
-                    
-                    # Add item to parent's children
-                    stack[-1]['children'].append(item)
-                    stack.append(item)
-            
-            # Extract final TOC from root
-            toc = stack[0]['children']
+            toc = detect_outline(filename)
 
         return jsonify({'toc': toc}), 200
 
@@ -385,6 +414,7 @@ def get_table_of_contents():
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/chat', methods=['POST'])
+@admission_controlled
 def chat():
     """Handle contextual chat with conversation history"""
     try:
@@ -394,10 +424,10 @@ def chat():
         question = data.get('question', '')
 
         # Get current page content
-        if current_app.config.get('CURRENT_PDF'):
-            reader = PdfReader(current_app.config['CURRENT_PDF'])
-            if 1 <= current_page <= len(reader.pages):
-                page_content = reader.pages[current_page - 1].extract_text()
+        pdf_path = get_current_pdf()
+        if pdf_path:
+            if 1 <= current_page <= get_page_count(pdf_path):
+                page_content = get_page_texts(pdf_path, current_page, current_page)[0]
             else:
                 page_content = "No content available for this page."
         else:
@@ -459,7 +489,8 @@ def chat():
         # Get response from OpenAI using the new client format
         client = get_openai_client()
         try:
-            response = client.chat.completions.create(
+            response = create_chat_completion(
+                client,
                 model="gpt-3.5-turbo",
                 messages=chat_messages,
                 temperature=0.7,
@@ -472,9 +503,9 @@ def chat():
             print(f"OpenAI API Error: {str(api_error)}")
             return jsonify({"error": "Failed to get response from AI model. Please try again."}), 500
 
-    except RateLimitError as e:
-        print(f"OpenAI Rate Limit Error: {str(e)}")
-        return jsonify({"error": "Rate limit exceeded. Please try again in a moment."}), 429
     except Exception as e:
+        if is_rate_limit_error(e):
+            print(f"OpenAI Rate Limit Error: {str(e)}")
+            return jsonify({"error": "Rate limit exceeded. Please try again in a moment."}), 429
         print(f"Chat Error: {str(e)}")
         return jsonify({"error": "An error occurred while processing your request. Please try again."}), 500 
\ No newline at end of file
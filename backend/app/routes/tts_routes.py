@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify, current_app, send_file
 import os
-import requests
 from io import BytesIO
-from PyPDF2 import PdfReader
+from ..utils.clients import get_http_session, post_coalesced
+from ..utils.janitor import get_janitor, audio_group
+from ..utils.admission import admission_controlled
+from ..utils.atomic import atomic_open
+from ..utils.singleflight import request_key
 
 bp = Blueprint('tts', __name__, url_prefix='/api/tts')
 
@@ -15,6 +18,10 @@ def get_elevenlabs_api_key():
     print("===================================\n")
     return api_key
 
+def elevenlabs_url(path):
+    """Build a full ElevenLabs API URL from the configured base URL"""
+    return f"{current_app.config['ELEVENLABS_BASE_URL']}{path}"
+
 @bp.route('/voices', methods=['GET'])
 def list_voices():
     """Get available voices from ElevenLabs"""
@@ -26,8 +33,8 @@ def list_voices():
             return jsonify({'error': 'ElevenLabs API key not configured'}), 500
 
         print("Making request to ElevenLabs API...")
-        response = requests.get(
-            'https://api.elevenlabs.io/v1/voices',
+        response = get_http_session().get(
+            elevenlabs_url('/v1/voices'),
             headers={'xi-api-key': api_key}
         )
 
@@ -52,6 +59,7 @@ def list_voices():
         print("=== Voice List Request Complete ===\n")
 
 @bp.route('/read-pdf', methods=['POST'])
+@admission_controlled
 def read_pdf_page():
     """Convert PDF page text to speech using ElevenLabs"""
     try:
@@ -85,13 +93,14 @@ def read_pdf_page():
             text = f'<speak><prosody rate="{int((speed-1)*100)}%">{text}</prosody></speak>'
 
         # Request TTS from ElevenLabs
-        response = requests.post(
-            f'https://api.elevenlabs.io/v1/text-to-speech/{data["voice_id"]}',
+        # Identical concurrent requests (a whole class pressing play) share one upstream call
+        response = post_coalesced(
+            elevenlabs_url(f'/v1/text-to-speech/{data["voice_id"]}'),
             headers={
                 'xi-api-key': api_key,
                 'Content-Type': 'application/json'
             },
-            json={
+            payload={
                 'text': text,
                 'model_id': 'eleven_monolingual_v1',
                 'voice_settings': {
@@ -106,12 +115,15 @@ def read_pdf_page():
             audio_data = BytesIO(response.content)
             audio_data.seek(0)
             
-            # Generate a temporary filename
-            temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f'temp_audio_page_{data["page"]}.mp3')
+            # Generate a temporary filename unique to the synthesized text and voice,
+            # so workers handling different documents never overwrite each other
+            audio_key = request_key(data['voice_id'], text)[:16]
+            temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f'temp_audio_page_{data["page"]}_{audio_key}.mp3')
             
-            # Save the audio file
-            with open(temp_path, 'wb') as f:
+            # Save the audio file atomically; concurrent requests may write the same file
+            with atomic_open(temp_path, 'wb') as f:
                 f.write(audio_data.read())
+            get_janitor().track([temp_path], group=audio_group(temp_path))
             
             # Return the audio file directly
             return send_file(
@@ -0,0 +1,207 @@
+"""
+Per-client admission control for expensive routes.
+
+Each client gets a token-bucket rate limit and a cap on concurrent requests.
+Requests that cannot start immediately wait in a bounded queue, and freed
+slots are handed out round-robin across clients so one busy client cannot
+starve the others. When the queue is full (or a wait times out) the request
+is rejected with 429 and a Retry-After estimate.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import wraps
+from flask import current_app, jsonify, make_response, request
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Consume a token; returns 0 on success or seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class AdmissionController:
+    def __init__(self, max_active, per_client_active, per_client_queue, max_queue,
+                 rate, burst, queue_timeout):
+        self.max_active = max_active
+        self.per_client_active = per_client_active
+        self.per_client_queue = per_client_queue
+        self.max_queue = max_queue
+        self.rate = rate
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+
+        self.lock = threading.Lock()
+        self.active = 0
+        self.client_active = {}
+        self.waiters = OrderedDict()  # client -> deque of waiters, in round-robin order
+        self.queued = 0
+        self.buckets = {}
+        self.avg_service = 1.0  # Moving average of request duration, for Retry-After
+
+    def _retry_after(self):
+        # Rough time for the queue ahead of a new request to drain
+        return max(1, math.ceil(self.avg_service * (self.queued + 1) / self.max_active))
+
+    def _dispatch(self):
+        """Hand free slots to queued clients in round-robin order (lock held)"""
+        while self.active < self.max_active:
+            for client, queue in self.waiters.items():
+                if self.client_active.get(client, 0) < self.per_client_active:
+                    break
+            else:
+                return
+
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self.waiters.move_to_end(client)  # Next slot goes to another client
+            else:
+                del self.waiters[client]
+            self._grant(client)
+            waiter['granted'] = True
+            waiter['event'].set()
+
+    def _grant(self, client):
+        self.active += 1
+        self.client_active[client] = self.client_active.get(client, 0) + 1
+
+    def acquire(self, client):
+        """Block until the client may proceed, or raise AdmissionRejected"""
+        with self.lock:
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                bucket = self.buckets[client] = TokenBucket(self.rate, self.burst)
+            wait = bucket.take()
+            if wait:
+                raise AdmissionRejected('Rate limit exceeded', max(1, math.ceil(wait)))
+
+            if (self.active < self.max_active and not self.waiters
+                    and self.client_active.get(client, 0) < self.per_client_active):
+                self._grant(client)
+                return
+
+            queue = self.waiters.get(client)
+            if self.queued >= self.max_queue or (queue is not None and len(queue) >= self.per_client_queue):
+                raise AdmissionRejected('Too many requests queued', self._retry_after())
+
+            waiter = {'event': threading.Event(), 'granted': False}
+            if queue is None:
+                queue = self.waiters[client] = deque()
+            queue.append(waiter)
+            self.queued += 1
+            self._dispatch()
+
+        waiter['event'].wait(self.queue_timeout)
+        with self.lock:
+            if waiter['granted']:
+                return
+            # Timed out: leave the queue
+            queue = self.waiters.get(client)
+            if queue is not None and waiter in queue:
+                queue.remove(waiter)
+                self.queued -= 1
+                if not queue:
+                    del self.waiters[client]
+            raise AdmissionRejected('Timed out waiting for capacity', self._retry_after())
+
+    def release(self, client, duration):
+        with self.lock:
+            self.active -= 1
+            self.client_active[client] -= 1
+            if not self.client_active[client]:
+                del self.client_active[client]
+            self.avg_service = 0.9 * self.avg_service + 0.1 * duration
+            self._prune_buckets()
+            self._dispatch()
+
+    def _prune_buckets(self):
+        # Forget clients whose buckets have fully refilled
+        if len(self.buckets) > 1000:
+            now = time.monotonic()
+            full_after = self.burst / self.rate
+            for client in [c for c, b in self.buckets.items() if now - b.updated > full_after]:
+                del self.buckets[client]
+
+def client_id():
+    """Identify the caller by address, or by X-Client-Id / X-Forwarded-For when trusted
+
+    Both headers are set by the caller, so they are only honoured when a
+    trusted proxy in front of the app controls them; otherwise a client could
+    pick a fresh identity per request and bypass the per-client limits.
+    """
+    if current_app.config['ADMISSION_TRUST_CLIENT_ID'] and request.headers.get('X-Client-Id'):
+        return request.headers['X-Client-Id']
+    if current_app.config['ADMISSION_TRUST_FORWARDED'] and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+def admission_controlled(view):
+    """Run the view only once the client is admitted; reply 429 with Retry-After otherwise"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        controller = current_app.extensions['admission']
+        client = client_id()
+        try:
+            controller.acquire(client)
+        except AdmissionRejected as e:
+            print(f"Admission rejected for {client}: {e.reason}")
+            response = jsonify({'error': f'{e.reason}. Please try again in a moment.'})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+
+        started = time.monotonic()
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            controller.release(client, time.monotonic() - started)
+            raise
+        # Hold the slot until the body (possibly streamed) has been sent
+        response.call_on_close(lambda: controller.release(client, time.monotonic() - started))
+        return response
+    return wrapper
+
+def thread_limits(config):
+    """(max_active, max_queue) that fit in one worker's threads
+
+    Queued requests hold a WSGI thread while they wait, so active + queued
+    must leave ADMISSION_RESERVED_THREADS free for cheap routes; otherwise
+    the queue never fills, 429 is never sent and everything else stalls.
+    """
+    budget = max(1, config['ADMISSION_WORKER_THREADS'] - config['ADMISSION_RESERVED_THREADS'])
+    max_active = max(1, min(config['ADMISSION_MAX_ACTIVE'], budget))
+    max_queue = max(0, min(config['ADMISSION_MAX_QUEUE'], budget - max_active))
+    return max_active, max_queue
+
+def init_app(app):
+    max_active, max_queue = thread_limits(app.config)
+    if (max_active, max_queue) != (app.config['ADMISSION_MAX_ACTIVE'], app.config['ADMISSION_MAX_QUEUE']):
+        print(f"Admission: limited to {max_active} active + {max_queue} queued requests "
+              f"to fit {app.config['ADMISSION_WORKER_THREADS']} worker threads")
+    app.extensions['admission'] = AdmissionController(
+        max_active=max_active,
+        per_client_active=app.config['ADMISSION_PER_CLIENT_ACTIVE'],
+        per_client_queue=app.config['ADMISSION_PER_CLIENT_QUEUE'],
+        max_queue=max_queue,
+        rate=app.config['ADMISSION_RATE'],
+        burst=app.config['ADMISSION_BURST'],
+        queue_timeout=app.config['ADMISSION_QUEUE_TIMEOUT']
+    )
@@ -0,0 +1,24 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'wb', **kwargs):
+    """
+    Open a temporary file next to path and rename it over path on success.
+
+    Readers in other workers see either the old file or the complete new one,
+    never a partially written file. On error the temporary file is removed.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=f".{name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,128 @@
+"""
+Lazily created upstream clients and tokenizer.
+
+openai, tiktoken, PyPDF2 and requests are imported on first use instead of at
+app import, so workers start quickly. warm_up() can preload them in the
+background once the app is serving.
+"""
+import os
+import sys
+import threading
+import time
+from flask import current_app
+from .singleflight import SingleFlight, request_key
+
+TOKENIZER_MODEL = "gpt-3.5-turbo"
+
+_lock = threading.Lock()
+_encoding = None
+_http_session = None
+_openai_clients = {}
+_flights = SingleFlight()  # Coalesces identical concurrent upstream calls
+
+def get_encoding():
+    """Return the cached tiktoken encoding, loading the BPE table on first use"""
+    global _encoding
+    if _encoding is None:
+        with _lock:
+            if _encoding is None:
+                import tiktoken
+                _encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text using tiktoken"""
+    return len(get_encoding().encode(text))
+
+def get_openai_client():
+    """Return a shared OpenAI client for the configured API key and base URL"""
+    api_key = os.getenv('OPENAI_API_KEY')
+    base_url = current_app.config.get('OPENAI_BASE_URL')
+    key = (api_key, base_url)
+    client = _openai_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _openai_clients.get(key)
+            if client is None:
+                from openai import OpenAI
+                # Print masked version of API key for debugging
+                if api_key:
+                    masked_key = f"{api_key[:8]}...{api_key[-4:]}"
+                    print(f"Using API key: {masked_key}")
+                else:
+                    print("Warning: No API key found!")
+                if base_url:
+                    print(f"Using OpenAI base URL: {base_url}")
+                client = OpenAI(api_key=api_key, base_url=base_url)
+                _openai_clients[key] = client
+    return client
+
+def get_http_session():
+    """Return a shared requests session so upstream connections are reused"""
+    global _http_session
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                import requests
+                _http_session = requests.Session()
+    return _http_session
+
+def create_chat_completion(client, **kwargs):
+    """chat.completions.create, sharing one call among identical concurrent requests"""
+    key = request_key('openai.chat', str(client.base_url), kwargs)
+    return _flights.do(
+        key,
+        lambda: client.chat.completions.create(**kwargs),
+        timeout=current_app.config['SINGLEFLIGHT_TIMEOUT']
+    )
+
+def post_coalesced(url, headers, payload):
+    """POST JSON upstream, sharing one call among identical concurrent requests
+
+    The returned response's body has already been read, so it is safe to share.
+    """
+    def call():
+        response = get_http_session().post(url, headers=headers, json=payload)
+        _ = response.content
+        return response
+
+    return _flights.do(
+        request_key('http.post', url, payload),
+        call,
+        timeout=current_app.config['SINGLEFLIGHT_TIMEOUT']
+    )
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True if error is an OpenAI rate limit error (without importing openai eagerly)"""
+    openai = sys.modules.get('openai')
+    return openai is not None and isinstance(error, openai.RateLimitError)
+
+def warm_up(app):
+    """
+    Preload the tokenizer, PDF reader and upstream clients in a background thread.
+
+    Timings are recorded in app.config['STARTUP_REPORT']['warmup_ms'].
+    """
+    def run():
+        timings = {}
+
+        def timed(name, fn):
+            start = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {str(e)}")
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+        timed('tokenizer', lambda: count_tokens("warm up"))
+        timed('pypdf2', lambda: __import__('PyPDF2'))
+        timed('http_session', get_http_session)
+        with app.app_context():
+            timed('openai_client', get_openai_client)
+
+        app.config['STARTUP_REPORT']['warmup_ms'] = timings
+        print(f"Warm-up complete: {timings}")
+
+    thread = threading.Thread(target=run, name='warm-up', daemon=True)
+    thread.start()
+    return thread
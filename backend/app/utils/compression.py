@@ -0,0 +1,97 @@
+import gzip
+import os
+from flask import request, send_file
+from .atomic import atomic_open
+
+try:
+    import brotli  # Optional: enables 'br' alongside gzip
+except ImportError:
+    brotli = None
+
+# Content-Encoding -> file suffix, in order of preference
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/javascript'}
+MIN_COMPRESS_SIZE = 1024  # Not worth compressing tiny responses
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Fast enough for per-request use
+PRECOMPRESS_BROTLI_QUALITY = 11  # Artifacts are compressed once, so use the maximum
+
+def available_encodings():
+    """Encodings this server can produce, in order of preference"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def negotiate_encoding(candidates):
+    """Pick the client's preferred encoding among candidates, or None for identity"""
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = request.accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(data: bytes, encoding: str, brotli_quality: int = BROTLI_QUALITY) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+def write_precompressed(path: str) -> list:
+    """Write .gz (and .br when brotli is installed) variants next to an artifact
+
+    Returns the paths of the variants written.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    for encoding in available_encodings():
+        variant_path = path + PRECOMPRESSED_SUFFIXES[encoding]
+        with atomic_open(variant_path, 'wb') as f:
+            f.write(compress(data, encoding, PRECOMPRESS_BROTLI_QUALITY))
+        written.append(variant_path)
+    return written
+
+def send_precompressed(path: str, mimetype: str):
+    """
+    Send an artifact, using a precompressed variant if the client accepts one.
+
+    No compression work happens per request; the identity file is the fallback.
+    """
+    candidates = [
+        encoding for encoding in PRECOMPRESSED_SUFFIXES
+        if os.path.exists(path + PRECOMPRESSED_SUFFIXES[encoding])
+    ]
+    encoding = negotiate_encoding(candidates)
+    if encoding is None:
+        response = send_file(path, mimetype=mimetype, conditional=True)
+    else:
+        response = send_file(path + PRECOMPRESSED_SUFFIXES[encoding], mimetype=mimetype, conditional=True)
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+def compress_response(response):
+    """after_request hook: compress JSON and text responses the client can decode"""
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    mimetype = response.mimetype or ''
+    if not (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    encoding = negotiate_encoding(available_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_app(app):
+    """Enable negotiated response compression for the app"""
+    app.after_request(compress_response)
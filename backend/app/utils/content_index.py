@@ -0,0 +1,67 @@
+import mmap
+import os
+from array import array
+from typing import List
+from .atomic import atomic_open
+
+# Pages are stored back to back in the content file, each followed by this separator
+PAGE_SEPARATOR = "\n\n"
+OFFSET_TYPECODE = 'Q'  # unsigned 64-bit byte offsets
+OFFSET_SIZE = array(OFFSET_TYPECODE).itemsize
+
+def content_paths(upload_folder: str, filename: str):
+    """Return the (content file, page offset index) paths for a PDF"""
+    return (
+        os.path.join(upload_folder, f"{filename}_content.txt"),
+        os.path.join(upload_folder, f"{filename}_pages.idx")
+    )
+
+def write_content(text_path: str, index_path: str, pages: List[str]) -> None:
+    """
+    Write page texts to the content file and record each page's byte offset.
+
+    The index holds len(pages) + 1 offsets so page i spans
+    offsets[i]:offsets[i + 1] in the UTF-8 encoded content file.
+    """
+    offsets = array(OFFSET_TYPECODE, [0])
+    with atomic_open(text_path, 'wb') as f:
+        for page_text in pages:
+            data = (page_text + PAGE_SEPARATOR).encode('utf-8')
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+
+    with atomic_open(index_path, 'wb') as f:
+        offsets.tofile(f)
+
+def page_count(index_path: str) -> int:
+    """Number of pages recorded in an offset index"""
+    return max(0, os.path.getsize(index_path) // OFFSET_SIZE - 1)
+
+def _read_offsets(index_path: str, start: int, end: int) -> array:
+    """Read offsets for 0-based pages start..end (inclusive) without loading the index"""
+    offsets = array(OFFSET_TYPECODE)
+    with open(index_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offsets.frombytes(mm[start * OFFSET_SIZE:(end + 2) * OFFSET_SIZE])
+    return offsets
+
+def read_pages(text_path: str, index_path: str, start: int, end: int) -> List[str]:
+    """
+    Read the text of 1-based pages start..end (inclusive) via memory-mapped slices.
+
+    Only the requested byte ranges are touched, so memory use does not grow
+    with the size of the book.
+    """
+    offsets = _read_offsets(index_path, start - 1, end - 1)
+    if offsets[-1] == offsets[0]:
+        return [''] * (len(offsets) - 1)
+
+    pages = []
+    with open(text_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for i in range(len(offsets) - 1):
+                text = mm[offsets[i]:offsets[i + 1]].decode('utf-8')
+                if text.endswith(PAGE_SEPARATOR):
+                    text = text[:-len(PAGE_SEPARATOR)]
+                pages.append(text)
+    return pages
@@ -0,0 +1,106 @@
+"""
+Pluggable PDF text extraction backends.
+
+Backends are tried in the configured order (PDF_EXTRACTION_BACKENDS, e.g.
+"pymupdf,pdfium,pypdf2"). A backend is skipped if its library is not
+installed, if it raises, or if its output looks unusable, and the next one
+in the chain is tried. Every attempt is timed so engines can be compared.
+"""
+import time
+from typing import Dict, List
+
+DEFAULT_BACKENDS = 'pymupdf,pdfium,pypdf2'
+MIN_CHARS_PER_PAGE = 20  # Below this on average, assume the engine failed
+MAX_REPLACEMENT_RATIO = 0.05  # Too many U+FFFD characters means garbled text
+
+class BackendUnavailable(Exception):
+    """The backend's library is not installed"""
+
+def extract_pypdf2(pdf_path: str) -> List[str]:
+    from PyPDF2 import PdfReader
+    reader = PdfReader(pdf_path)
+    return [page.extract_text() for page in reader.pages]
+
+def extract_pdfium(pdf_path: str) -> List[str]:
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise BackendUnavailable('pypdfium2 is not installed')
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        pages = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+def extract_pymupdf(pdf_path: str) -> List[str]:
+    try:
+        import fitz
+    except ImportError:
+        raise BackendUnavailable('PyMuPDF is not installed')
+    with fitz.open(pdf_path) as doc:
+        return [page.get_text() for page in doc]
+
+BACKENDS = {
+    'pypdf2': extract_pypdf2,
+    'pdfium': extract_pdfium,
+    'pymupdf': extract_pymupdf,
+}
+
+def is_acceptable(pages: List[str]) -> bool:
+    """Heuristic check that extracted text is usable"""
+    if not pages:
+        return False
+    text = ''.join(pages)
+    if len(text.strip()) < MIN_CHARS_PER_PAGE * len(pages):
+        return False
+    return text.count('\ufffd') <= MAX_REPLACEMENT_RATIO * len(text)
+
+def parse_backends(value: str) -> List[str]:
+    names = [name.strip().lower() for name in (value or DEFAULT_BACKENDS).split(',') if name.strip()]
+    unknown = [name for name in names if name not in BACKENDS]
+    if unknown:
+        raise ValueError(f"Unknown extraction backends: {', '.join(unknown)}")
+    return names
+
+def extract_pages(pdf_path: str, backends: str = DEFAULT_BACKENDS) -> Dict:
+    """
+    Extract per-page text using the first backend in the chain that succeeds.
+
+    Returns {'pages': [...], 'backend': name, 'attempts': [...]} where each
+    attempt records the backend, its status and time taken in milliseconds.
+    If no backend produces acceptable text, the best non-empty result is used.
+    """
+    attempts = []
+    fallback = None
+    for name in parse_backends(backends):
+        start = time.perf_counter()
+        try:
+            pages = BACKENDS[name](pdf_path)
+        except BackendUnavailable:
+            attempts.append({'backend': name, 'status': 'unavailable', 'ms': 0})
+            continue
+        except Exception as e:
+            attempts.append({'backend': name, 'status': f'error: {str(e)}',
+                             'ms': round((time.perf_counter() - start) * 1000, 1)})
+            continue
+
+        elapsed = round((time.perf_counter() - start) * 1000, 1)
+        if is_acceptable(pages):
+            attempts.append({'backend': name, 'status': 'ok', 'ms': elapsed})
+            print(f"Extracted {len(pages)} pages with {name} in {elapsed}ms")
+            return {'pages': pages, 'backend': name, 'attempts': attempts}
+
+        attempts.append({'backend': name, 'status': 'rejected', 'ms': elapsed})
+        if fallback is None and pages:
+            fallback = (name, pages)
+
+    if fallback is None:
+        raise RuntimeError(f"No extraction backend could read the PDF: {attempts}")
+    # Scanned or image-only PDFs legitimately have little text; keep what we got
+    return {'pages': fallback[1], 'backend': fallback[0], 'attempts': attempts}
@@ -0,0 +1,151 @@
+"""
+Background storage janitor.
+
+Derived artifacts (PDFs, extracted text, indexes, metadata, audio) are
+registered in the shared state store when they are written. A timer thread
+expires temporary audio and evicts least recently used documents once the
+uploads folder exceeds its disk quota, so requests never pay for a directory
+scan. Every worker runs a janitor; sweeps are serialized by the store.
+"""
+import os
+import threading
+import time
+from flask import current_app
+from .vector_index import release as release_mappings
+
+AUDIO_GROUP = 'audio'  # Temporary TTS output, expired by age rather than LRU
+
+def audio_group(path):
+    """Group for one TTS file, so quota eviction drops audio oldest first, one file at a time"""
+    return f"{AUDIO_GROUP}:{os.path.basename(path)}"
+
+def is_audio_group(group):
+    return group == AUDIO_GROUP or group.startswith(f"{AUDIO_GROUP}:")
+
+class Janitor:
+    def __init__(self, store, folder, quota_bytes, interval, audio_max_age):
+        self.store = store
+        self.folder = folder
+        self.quota_bytes = quota_bytes
+        self.interval = interval
+        self.audio_max_age = audio_max_age
+        self.lock = threading.Lock()
+        self.pending_touches = {}  # group -> last access, flushed on the next sweep
+        self.timer = None
+
+    def track(self, paths, group):
+        """Register freshly written artifacts as belonging to group"""
+        now = time.time()
+        entries = []
+        for path in paths:
+            try:
+                entries.append((os.path.basename(path), group, os.path.getsize(path), now))
+            except OSError:
+                continue
+        self.store.track_artifacts(entries)
+
+    def touch(self, group):
+        """Mark a group as used now; persisted on the next sweep, not per request"""
+        with self.lock:
+            self.pending_touches[group] = time.time()
+
+    def usage(self):
+        return self.store.total_size()
+
+    def _flush_touches(self):
+        with self.lock:
+            touches, self.pending_touches = self.pending_touches, {}
+        if touches:
+            self.store.touch_groups(touches)
+
+    def _remove(self, conn, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Janitor: error removing {name}: {e}")
+        release_mappings([os.path.join(self.folder, name) for name in names])
+        conn.executemany('DELETE FROM artifacts WHERE name = ?', [(name,) for name in names])
+
+    def sweep(self):
+        """Expire old audio and evict LRU document groups until under quota"""
+        self._flush_touches()
+        now = time.time()
+        protected = self.store.current_document()
+        with self.store.transaction() as conn:
+            rows = conn.execute('SELECT name, grp, size, last_access FROM artifacts').fetchall()
+
+            expired = [
+                name for name, group, _, last_access in rows
+                if is_audio_group(group) and now - last_access > self.audio_max_age
+            ]
+            expired_names = set(expired)
+            freed = sum(size for name, _, size, _ in rows if name in expired_names)
+            self._remove(conn, expired)
+
+            total = sum(size for _, _, size, _ in rows) - freed
+            evicted = []
+            if total > self.quota_bytes:
+                # Least recently used group first; a group's recency is its newest access
+                groups = {}
+                for name, group, size, last_access in rows:
+                    if name in expired_names:
+                        continue
+                    names, group_size, recency = groups.get(group, ([], 0, 0))
+                    groups[group] = (names + [name], group_size + size, max(recency, last_access))
+                for group in sorted(groups, key=lambda g: groups[g][2]):
+                    if total <= self.quota_bytes:
+                        break
+                    if group == protected:
+                        continue
+                    names, group_size, _ = groups[group]
+                    self._remove(conn, names)
+                    total -= group_size
+                    freed += group_size
+                    evicted.append(group)
+
+        if expired or evicted:
+            print(f"Janitor: removed {len(expired)} audio files, evicted {evicted}, freed {freed} bytes")
+        return {'expired_audio': len(expired), 'evicted_groups': evicted, 'freed_bytes': freed}
+
+    def purge(self):
+        """Remove every tracked artifact"""
+        with self.store.transaction() as conn:
+            rows = conn.execute('SELECT name, size FROM artifacts').fetchall()
+            self._remove(conn, [name for name, _ in rows])
+        return {'freed_bytes': sum(size for _, size in rows)}
+
+    def _run(self):
+        try:
+            self.sweep()
+        except Exception as e:
+            print(f"Janitor error: {str(e)}")
+        self._schedule()
+
+    def _schedule(self):
+        self.timer = threading.Timer(self.interval, self._run)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def start(self):
+        """Start the periodic sweep off the request path"""
+        if self.timer is None:
+            self._schedule()
+
+def init_app(app):
+    """Create the app's janitor from config and start its timer"""
+    janitor = Janitor(
+        app.extensions['state'],
+        app.config['UPLOAD_FOLDER'],
+        quota_bytes=app.config['STORAGE_QUOTA_MB'] * 1024 * 1024,
+        interval=app.config['JANITOR_INTERVAL'],
+        audio_max_age=app.config['TEMP_AUDIO_MAX_AGE']
+    )
+    app.extensions['janitor'] = janitor
+    janitor.start()
+    return janitor
+
+def get_janitor() -> Janitor:
+    return current_app.extensions['janitor']
@@ -0,0 +1,187 @@
+"""
+Token-reducing text normalization, applied once at ingestion.
+
+Raw extracted text carries hyphenated line breaks, ligature glyphs, running
+headers/footers, page numbers and whitespace runs. Every one of those costs
+tokens in every prompt built from the page, so they are cleaned up here
+before the text is stored.
+"""
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+LIGATURES = {
+    '\ufb00': 'ff', '\ufb01': 'fi', '\ufb02': 'fl', '\ufb03': 'ffi',
+    '\ufb04': 'ffl', '\ufb05': 'st', '\ufb06': 'st',
+    '\u00ad': '',  # Soft hyphen
+    '\u00a0': ' ', '\u202f': ' ',  # Non-breaking spaces
+    '\u200b': '',  # Zero-width space
+}
+LIGATURE_TABLE = str.maketrans(LIGATURES)
+
+EDGE_LINES = 2  # Lines at the top and bottom of a page checked for headers/footers
+RUNNING_HEADER_RATIO = 0.3  # Share of pages a line must repeat on to be a header/footer
+MIN_RUNNING_HEADER_PAGES = 3
+MAX_RUNNING_LINE_WORDS = 8  # Longer lines are body text, never headers/footers
+
+MAX_PAGE_NUMBER_GAP = 2  # Unnumbered pages allowed between two numbered ones
+
+# Arabic or lowercase roman page number, optionally "Page 3" / "3 of 120" / "3/120"
+PAGE_NUMBER_PATTERN = re.compile(
+    r'^\s*(?:(?i:page)\s+)?(?:(\d{1,4})|([ivxlc]{1,6}))(?:\s*(?:of|/)\s*\d{1,4})?\s*$'
+)
+ROMAN_VALUES = {'i': 1, 'v': 5, 'x': 10, 'l': 50, 'c': 100}
+HYPHEN_BREAK_PATTERN = re.compile(r'([A-Za-z]+)-[ \t]*\n[ \t]*([a-z]+)')
+WORD_PATTERN = re.compile(r'[a-z]+')
+SPACE_RUN_PATTERN = re.compile(r'[ \t\f\v]+')
+BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+EDGE_NUMBER_PATTERN = re.compile(r'^\d+(?=\s)|(?<=\s)\d+$')
+
+def fix_ligatures(text: str) -> str:
+    return text.translate(LIGATURE_TABLE)
+
+def document_words(pages: List[str]) -> set:
+    """Lowercase words that occur anywhere in the document"""
+    words = set()
+    for page in pages:
+        words.update(WORD_PATTERN.findall(page.lower()))
+    return words
+
+def dehyphenate(text: str, vocabulary: set) -> str:
+    """Rejoin words split across lines: "ther-\\nmodynamics" -> "thermodynamics"
+
+    The hyphen is only dropped when the joined word occurs elsewhere in the
+    document; otherwise it is a real compound ("well-\\nknown" -> "well-known").
+    """
+    def join(match):
+        left, right = match.group(1), match.group(2)
+        if (left + right).lower() in vocabulary:
+            return left + right
+        return f"{left}-{right}"
+    return HYPHEN_BREAK_PATTERN.sub(join, text)
+
+def collapse_whitespace(text: str) -> str:
+    text = SPACE_RUN_PATTERN.sub(' ', text)
+    text = '\n'.join(line.strip() for line in text.split('\n'))
+    return BLANK_LINES_PATTERN.sub('\n\n', text).strip()
+
+def _line_key(line: str) -> str:
+    """Key for matching headers/footers across pages; empty for lines that cannot be one"""
+    words = line.lower().split()
+    if len(words) > MAX_RUNNING_LINE_WORDS:
+        return ''
+    # Running headers often differ only by a leading or trailing page/chapter number
+    return EDGE_NUMBER_PATTERN.sub('#', ' '.join(words))
+
+def _edge_lines(lines: List[str]) -> Dict[str, List[int]]:
+    """Indices of the first and last few non-empty lines of a page"""
+    non_empty = [i for i, line in enumerate(lines) if line.strip()]
+    top = non_empty[:EDGE_LINES]
+    bottom = [i for i in non_empty[-EDGE_LINES:] if i not in top]
+    return {'top': top, 'bottom': bottom}
+
+def _roman_value(numeral: str):
+    """Integer value of a well-formed lowercase roman numeral, else None"""
+    total = 0
+    for i, char in enumerate(numeral):
+        value = ROMAN_VALUES[char]
+        total += -value if i + 1 < len(numeral) and ROMAN_VALUES[numeral[i + 1]] > value else value
+    return total if total > 0 and _to_roman(total) == numeral else None
+
+def _to_roman(value: int) -> str:
+    result = ''
+    for number, numeral in [(100, 'c'), (90, 'xc'), (50, 'l'), (40, 'xl'), (10, 'x'), (9, 'ix'),
+                            (5, 'v'), (4, 'iv'), (1, 'i')]:
+        while value >= number:
+            result += numeral
+            value -= number
+    return result
+
+def _page_number(line: str):
+    """(kind, value) if the line looks like a page number, else None"""
+    match = PAGE_NUMBER_PATTERN.match(line)
+    if not match:
+        return None
+    if match.group(1):
+        return 'arabic', int(match.group(1))
+    value = _roman_value(match.group(2))
+    return ('roman', value) if value else None
+
+def find_page_numbers(pages_lines: List[List[str]]) -> List[set]:
+    """Indices of edge lines per page that continue the page numbering
+
+    A number counts only when a nearby page carries the matching number in
+    sequence, so a bare "42" answer or a word like "civil" is kept.
+    """
+    candidates = []
+    for lines in pages_lines:
+        page_candidates = {}
+        for indices in _edge_lines(lines).values():
+            for i in indices:
+                number = _page_number(lines[i])
+                if number:
+                    page_candidates[i] = number
+        candidates.append(page_candidates)
+
+    found = []
+    for page, page_candidates in enumerate(candidates):
+        indices = set()
+        for i, (kind, value) in page_candidates.items():
+            for gap in range(1, MAX_PAGE_NUMBER_GAP + 1):
+                neighbours = [(page - gap, value - gap), (page + gap, value + gap)]
+                if any(0 <= other < len(candidates) and (kind, expected) in candidates[other].values()
+                       for other, expected in neighbours):
+                    indices.add(i)
+                    break
+        found.append(indices)
+    return found
+
+def find_running_lines(pages_lines: List[List[str]]) -> Dict[str, set]:
+    """Keys of lines that repeat at the same page edge across many pages"""
+    counts = {'top': Counter(), 'bottom': Counter()}
+    for lines in pages_lines:
+        for edge, indices in _edge_lines(lines).items():
+            counts[edge].update({_line_key(lines[i]) for i in indices})
+    threshold = max(MIN_RUNNING_HEADER_PAGES, RUNNING_HEADER_RATIO * len(pages_lines))
+    return {
+        edge: {key for key, count in edge_counts.items() if key and count >= threshold}
+        for edge, edge_counts in counts.items()
+    }
+
+def normalize_pages(pages: List[str]) -> Tuple[List[str], Dict]:
+    """
+    Normalize every page of a document.
+
+    Returns the cleaned pages and counts of what was removed.
+    """
+    pages_lines = [fix_ligatures(page).split('\n') for page in pages]
+    running = find_running_lines(pages_lines)
+    page_numbers = find_page_numbers(pages_lines)
+    vocabulary = document_words(pages)
+
+    stats = {'running_lines_removed': 0, 'page_numbers_removed': 0}
+    normalized = []
+    for lines, numbered in zip(pages_lines, page_numbers):
+        drop = set()
+        for edge, indices in _edge_lines(lines).items():
+            for i in indices:
+                if i in numbered:
+                    drop.add(i)
+                    stats['page_numbers_removed'] += 1
+                elif _line_key(lines[i]) in running[edge]:
+                    drop.add(i)
+                    stats['running_lines_removed'] += 1
+        text = '\n'.join(line for i, line in enumerate(lines) if i not in drop)
+        normalized.append(collapse_whitespace(dehyphenate(text, vocabulary)))
+    return normalized, stats
+
+def token_savings(raw_pages: List[str], normalized_pages: List[str], count_tokens) -> Dict:
+    """Token counts before and after normalization"""
+    before = sum(count_tokens(page) for page in raw_pages)
+    after = sum(count_tokens(page) for page in normalized_pages)
+    return {
+        'tokens_before': before,
+        'tokens_after': after,
+        'tokens_saved': before - after,
+        'percent_saved': round(100.0 * (before - after) / before, 1) if before else 0.0
+    }
@@ -0,0 +1,179 @@
+"""
+Local outline (table of contents) detection for PDFs without bookmarks.
+
+Walks every page's text runs once, using font size, font weight and
+numbering patterns ("Chapter 3", "2.4 Energy", "IV. Results") to infer
+chapter and section headings. No network calls are made.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+HEADING_SIZE_RATIO = 1.15  # Lines this much larger than body text are headings
+MAX_HEADING_CHARS = 120
+MAX_HEADINGS_PER_PAGE = 4
+MIN_RUNNING_HEADER_PAGES = 3  # Lines repeated on this many nearby pages are running headers
+MAX_RUNNING_HEADER_GAP = 2  # Page gap still counted as the same run (alternating verso/recto headers)
+MAX_LEVELS = 3
+
+CHAPTER_PATTERN = re.compile(r'^(chapter|part|unit|module|lesson)\s+([0-9]+|[ivxlc]+)\b', re.IGNORECASE)
+NUMBERED_PATTERN = re.compile(r'^(\d+(?:\.\d+)*)\.?\s+\S')
+ROMAN_PATTERN = re.compile(r'^[IVXLC]+\.\s+\S')
+PAGE_NUMBER_EDGE_PATTERN = re.compile(r'^\d+\s+|\s+\d+$')
+
+def _pymupdf_lines(pdf_path: str):
+    """Yield (page_number, text, size, bold) per line using PyMuPDF span metadata"""
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        for page_number, page in enumerate(doc, start=1):
+            for block in page.get_text('dict')['blocks']:
+                for line in block.get('lines', []):
+                    spans = [span for span in line['spans'] if span['text'].strip()]
+                    if not spans:
+                        continue
+                    text = ''.join(span['text'] for span in spans).strip()
+                    size = max(span['size'] for span in spans)
+                    bold_chars = sum(len(span['text']) for span in spans if span['flags'] & 16)
+                    yield page_number, text, size, bold_chars * 2 >= len(text)
+
+def _pypdf2_lines(pdf_path: str):
+    """Yield (page_number, text, size, bold) per line from PyPDF2 content stream callbacks"""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(pdf_path)
+    for page_number, page in enumerate(reader.pages, start=1):
+        runs = []
+
+        def visitor(text, cm, tm, font_dict, font_size):
+            if not text.strip():
+                return
+            # Effective size: font size scaled by the text and current transformation matrices
+            m = [tm[0] * cm[0] + tm[1] * cm[2], tm[0] * cm[1] + tm[1] * cm[3],
+                 tm[2] * cm[0] + tm[3] * cm[2], tm[2] * cm[1] + tm[3] * cm[3],
+                 tm[4] * cm[0] + tm[5] * cm[2] + cm[4], tm[4] * cm[1] + tm[5] * cm[3] + cm[5]]
+            size = (font_size or 0) * math.hypot(m[2], m[3])
+            font_name = str(font_dict.get('/BaseFont', '')) if font_dict else ''
+            bold = 'bold' in font_name.lower() or 'black' in font_name.lower()
+            runs.append((round(m[5], 1), text, size, bold))
+
+        page.extract_text(visitor_text=visitor)
+
+        # Merge runs sharing a baseline into lines
+        line_y, parts = None, []
+        for y, text, size, bold in runs + [(None, '', 0, False)]:
+            if parts and (y is None or abs(y - line_y) > 1):
+                line_text = ' '.join(' '.join(p[0].split()) for p in parts).strip()
+                if line_text:
+                    bold_chars = sum(len(p[0]) for p in parts if p[2])
+                    yield (page_number, line_text, max(p[1] for p in parts),
+                           bold_chars * 2 >= sum(len(p[0]) for p in parts))
+                parts = []
+            if y is not None:
+                for piece in text.split('\n'):
+                    if piece.strip():
+                        parts.append((piece, size, bold))
+                line_y = y
+
+def _read_lines(pdf_path: str) -> List:
+    try:
+        return list(_pymupdf_lines(pdf_path))
+    except ImportError:
+        return list(_pypdf2_lines(pdf_path))
+
+def _numbering_depth(text: str):
+    """Heading depth implied by its numbering, or None if unnumbered"""
+    if CHAPTER_PATTERN.match(text):
+        return 0
+    match = NUMBERED_PATTERN.match(text)
+    if match:
+        return match.group(1).count('.')
+    if ROMAN_PATTERN.match(text):
+        return 0
+    return None
+
+def _running_key(text: str) -> str:
+    """Text key for running-header matching, ignoring a leading or trailing page number"""
+    return PAGE_NUMBER_EDGE_PATTERN.sub('', ' '.join(text.lower().split()))
+
+def _running_lines(lines: List) -> set:
+    """(page, text key, size) of lines repeated across a run of nearby pages
+
+    Runs are found per line rather than against the whole book, so a header
+    that changes every chapter ("Chapter 3 Waves") is still caught. The size
+    is part of the key so a chapter's real heading is not mistaken for its
+    own running header.
+    """
+    pages_by_key = {}
+    for page, text, size, _ in lines:
+        pages_by_key.setdefault((_running_key(text), round(size, 1)), set()).add(page)
+
+    running = set()
+    for (key, size), pages in pages_by_key.items():
+        run = []
+        for page in sorted(pages) + [None]:
+            if run and (page is None or page - run[-1] > MAX_RUNNING_HEADER_GAP):
+                if len(run) >= MIN_RUNNING_HEADER_PAGES:
+                    running.update((p, key, size) for p in run)
+                run = []
+            if page is not None:
+                run.append(page)
+    return running
+
+def _nest(headings: List[Dict]) -> List[Dict]:
+    """Turn a flat list of headings with levels into the nested TOC format"""
+    root = {'children': []}
+    stack = [root]
+    for heading in headings:
+        item = dict(heading, children=[])
+        # Adjust stack for current level
+        while len(stack) > item['level'] + 1:
+            stack.pop()
+        # Clamp levels that skip a step (e.g. a 2.1.1 directly under a chapter)
+        item['level'] = len(stack) - 1
+        stack[-1]['children'].append(item)
+        stack.append(item)
+    return root['children']
+
+def detect_outline(pdf_path: str) -> List[Dict]:
+    """Infer a hierarchical TOC: [{'title', 'pageNumber', 'level', 'children'}]"""
+    lines = _read_lines(pdf_path)
+    if not lines:
+        return []
+
+    # Body text size is the size covering the most characters
+    size_chars = Counter()
+    for _, text, size, _ in lines:
+        size_chars[round(size, 1)] += len(text)
+    body_size = size_chars.most_common(1)[0][0]
+
+    # Lines repeated across runs of pages are running headers/footers, not headings
+    running = _running_lines(lines)
+
+    candidates = []
+    per_page = Counter()
+    seen_titles = set()
+    for page, text, size, bold in lines:
+        if (len(text) < 3 or len(text) > MAX_HEADING_CHARS or not re.search(r'[A-Za-z]', text)
+                or text.endswith(('.', ',', ';')) or (page, _running_key(text), round(size, 1)) in running):
+            continue
+        larger = body_size and size >= body_size * HEADING_SIZE_RATIO
+        depth = _numbering_depth(text)
+        # Numbering alone only counts for lines at body size or bold, not small print
+        numbered = depth is not None and (bold or size >= body_size)
+        if not (larger or (numbered and (bold or CHAPTER_PATTERN.match(text)))):
+            continue
+        # A title that repeats (e.g. on a continuation page) is listed at its first page
+        title_key = ' '.join(text.lower().split())
+        if title_key in seen_titles or per_page[page] >= MAX_HEADINGS_PER_PAGE:
+            continue
+        seen_titles.add(title_key)
+        per_page[page] += 1
+        candidates.append({'title': text, 'pageNumber': page, 'size': round(size, 1), 'depth': depth})
+
+    # Unnumbered headings are ranked by font size: the largest size is level 0
+    heading_sizes = sorted({c['size'] for c in candidates}, reverse=True)
+    headings = []
+    for c in candidates:
+        level = c['depth'] if c['depth'] is not None else heading_sizes.index(c['size'])
+        headings.append({'title': c['title'], 'pageNumber': c['pageNumber'], 'level': min(level, MAX_LEVELS - 1)})
+    return _nest(headings)
@@ -0,0 +1,64 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When many requests need exactly the same upstream call at the same time
+(e.g. a whole class pressing play on page 42), the first caller makes the
+call and every concurrent caller with the same key waits for and shares its
+result or exception. Keys are released as soon as the call finishes, so
+nothing is cached afterwards.
+"""
+import hashlib
+import json
+import threading
+
+class FlightTimeout(TimeoutError):
+    """Gave up waiting for another caller's in-flight request"""
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn, timeout=None):
+        """Run fn() once per key among concurrent callers and share the outcome
+
+        Waiters raise FlightTimeout after timeout seconds; the call itself
+        keeps running for the caller that started it.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.event.set()
+            if call.waiters:
+                print(f"Single-flight: shared one upstream call with {call.waiters} waiters")
+        elif not call.event.wait(timeout):
+            raise FlightTimeout(f"Timed out after {timeout}s waiting for an identical in-flight request")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+def request_key(*parts) -> str:
+    """Stable key for an upstream request built from its full payload"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -0,0 +1,189 @@
+"""
+Shared document and session state.
+
+State that used to live in app.config (the current PDF) or in ad-hoc JSON
+files (Q&A history, the janitor manifest) is kept in a SQLite database in
+WAL mode inside the uploads folder, so every Gunicorn worker on the host sees
+the same view and concurrent writers are serialized by SQLite.
+"""
+import json
+import os
+import sqlite3
+import threading
+from flask import current_app
+
+DB_NAME = 'state.db'
+LEGACY_HISTORY_SUFFIX = '_qa_history.json'  # Per-document history files from before state.db
+BUSY_TIMEOUT = 30  # seconds to wait on a lock held by another worker
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    name TEXT PRIMARY KEY,
+    grp TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_grp ON artifacts (grp);
+CREATE TABLE IF NOT EXISTS qa_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS qa_history_filename ON qa_history (filename);
+"""
+
+class StateStore:
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def _connect(self):
+        # Autocommit mode; multi-statement updates use explicit transactions
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @property
+    def conn(self):
+        """Per-thread connection, reopened after a fork"""
+        if getattr(self.local, 'pid', None) != os.getpid():
+            self.local.conn = self._connect()
+            self.local.pid = os.getpid()
+        return self.local.conn
+
+    def transaction(self):
+        """Context manager for a write transaction that takes the lock up front"""
+        return _Transaction(self.conn)
+
+    # Settings
+
+    def get_setting(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_setting(self, key, value):
+        self.conn.execute(
+            'INSERT INTO settings (key, value) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+            (key, value)
+        )
+
+    def current_document(self):
+        return self.get_setting('current_document')
+
+    def set_current_document(self, filename):
+        self.set_setting('current_document', filename)
+
+    # Artifacts tracked by the janitor
+
+    def track_artifacts(self, entries):
+        """entries: iterable of (name, group, size, last_access)"""
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO artifacts (name, grp, size, last_access) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET grp = excluded.grp, size = excluded.size, '
+                'last_access = excluded.last_access',
+                list(entries)
+            )
+
+    def touch_groups(self, touches):
+        """touches: dict of group -> last access time"""
+        with self.transaction() as conn:
+            conn.executemany(
+                'UPDATE artifacts SET last_access = MAX(last_access, ?) WHERE grp = ?',
+                [(when, group) for group, when in touches.items()]
+            )
+
+    def total_size(self):
+        return self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM artifacts').fetchone()[0]
+
+    # Q&A history
+
+    def add_interaction(self, filename, question, answer, timestamp):
+        self.conn.execute(
+            'INSERT INTO qa_history (filename, question, answer, timestamp) VALUES (?, ?, ?, ?)',
+            (filename, question, answer, timestamp)
+        )
+
+    def history(self, filename):
+        rows = self.conn.execute(
+            'SELECT question, answer, timestamp FROM qa_history WHERE filename = ? ORDER BY id',
+            (filename,)
+        ).fetchall()
+        return [{'question': q, 'answer': a, 'timestamp': t} for q, a, t in rows]
+
+    def import_legacy_history(self, folder):
+        """Move <filename>_qa_history.json files into qa_history, once
+
+        Each file is renamed to .imported inside the same transaction that
+        inserts its rows, so concurrent workers never import it twice.
+        """
+        imported = 0
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith(LEGACY_HISTORY_SUFFIX):
+                continue
+            path = os.path.join(folder, name)
+            filename = name[:-len(LEGACY_HISTORY_SUFFIX)]
+            with self.transaction() as conn:
+                if not os.path.exists(path):
+                    continue  # Imported by another worker
+                try:
+                    with open(path, 'r') as f:
+                        entries = json.load(f)
+                    rows = [(filename, e['question'], e['answer'], e.get('timestamp', '')) for e in entries]
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    print(f"Skipping unreadable history file {name}: {e}")
+                    continue
+                conn.executemany(
+                    'INSERT INTO qa_history (filename, question, answer, timestamp) VALUES (?, ?, ?, ?)',
+                    rows
+                )
+                os.replace(path, f"{path}.imported")
+                imported += len(rows)
+        if imported:
+            print(f"Imported {imported} Q&A history entries from legacy JSON files")
+        return imported
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+def init_app(app):
+    store = StateStore(os.path.join(app.config['UPLOAD_FOLDER'], DB_NAME))
+    store.import_legacy_history(app.config['UPLOAD_FOLDER'])
+    app.extensions['state'] = store
+
+def get_store() -> StateStore:
+    return current_app.extensions['state']
+
+def resolve_document(filename):
+    """Map the "current" aliases to the active document, or None if nothing is loaded"""
+    if filename in ['current', 'current.pdf']:
+        return get_store().current_document()
+    return filename
+
+def get_current_pdf():
+    """Full path of the active PDF shared by all workers, or None if nothing is loaded"""
+    filename = get_store().current_document()
+    if not filename:
+        return None
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    return path if os.path.exists(path) else None
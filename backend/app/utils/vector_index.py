@@ -0,0 +1,205 @@
+"""
+Dense vector index for semantic passage lookup.
+
+Page text is split into overlapping passages at ingestion, embedded with a
+pluggable embedder and saved as a float32 NumPy array. Queries open the
+array with mmap, so a 1,000-page book is searched with one matrix-vector
+product and the pages are shared through the OS page cache by every worker.
+
+The default "hashing" embedder (feature-hashed word unigrams and bigrams)
+needs no network or model download; "openai" uses the embeddings API.
+"""
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from .atomic import atomic_open
+
+PASSAGE_WORDS = 150
+PASSAGE_OVERLAP = 30
+HASHING_DIM = 2048
+OPENAI_EMBEDDING_MODEL = 'text-embedding-3-small'
+OPENAI_BATCH_SIZE = 256
+MAX_CACHED_ARRAYS = 8  # Open mappings per process (two per document)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the this to was were '
+    'what which with how why when who does do can'.split()
+)
+
+_cache_lock = threading.Lock()
+_mmap_cache = OrderedDict()  # path -> (mtime, array), least recently used first
+
+class HashingEmbedder:
+    """Stateless TF embedding via the hashing trick; identical in every process"""
+    name = 'hashing'
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = [w for w in TOKEN_PATTERN.findall(text.lower()) if w not in STOPWORDS]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]):
+        import numpy as np
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                # crc32 is stable across processes, unlike hash()
+                h = zlib.crc32(feature.encode('utf-8'))
+                index, sign = h % self.dim, 1.0 if (h >> 31) & 1 else -1.0
+                counts[index] = counts.get(index, 0.0) + sign
+            for index, count in counts.items():
+                # Sublinear term frequency damps repeated words
+                vectors[row, index] = math.copysign(1.0 + math.log(abs(count)), count) if count else 0.0
+        return _normalize_rows(vectors)
+
+class OpenAIEmbedder:
+    name = 'openai'
+
+    def embed(self, texts: List[str]):
+        import numpy as np
+        from .clients import get_openai_client
+
+        client = get_openai_client()
+        vectors = []
+        for start in range(0, len(texts), OPENAI_BATCH_SIZE):
+            response = client.embeddings.create(
+                model=OPENAI_EMBEDDING_MODEL,
+                input=[text or ' ' for text in texts[start:start + OPENAI_BATCH_SIZE]]
+            )
+            vectors.extend(item.embedding for item in response.data)
+        return _normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+EMBEDDERS = {
+    'hashing': HashingEmbedder,
+    'openai': OpenAIEmbedder,
+}
+
+def get_embedder(name: str):
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder: {name}")
+    return EMBEDDERS[name]()
+
+def _normalize_rows(vectors):
+    import numpy as np
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+def index_paths(upload_folder: str, filename: str) -> Dict[str, str]:
+    """Paths of the vector matrix, passage-to-page map and index info for a PDF"""
+    base = os.path.join(upload_folder, filename)
+    return {
+        'vectors': f"{base}_vectors.npy",
+        'pages': f"{base}_vector_pages.npy",
+        'info': f"{base}_vectors.json",
+    }
+
+def split_passages(pages: List[str]) -> Tuple[List[str], List[int]]:
+    """Overlapping word windows per page, with the 1-based page of each passage"""
+    passages, page_numbers = [], []
+    step = PASSAGE_WORDS - PASSAGE_OVERLAP
+    for page_number, text in enumerate(pages, start=1):
+        words = text.split()
+        for start in range(0, max(1, len(words) - PASSAGE_OVERLAP), step):
+            passage = ' '.join(words[start:start + PASSAGE_WORDS])
+            if passage:
+                passages.append(passage)
+                page_numbers.append(page_number)
+    return passages, page_numbers
+
+def build_index(paths: Dict[str, str], pages: List[str], embedder_name: str) -> Dict:
+    """Embed every passage and write the index atomically; returns the index info"""
+    import numpy as np
+
+    passages, page_numbers = split_passages(pages)
+    embedder = get_embedder(embedder_name)
+    vectors = embedder.embed(passages) if passages else np.zeros((0, 1), dtype=np.float32)
+
+    with atomic_open(paths['vectors'], 'wb') as f:
+        np.save(f, vectors)
+    with atomic_open(paths['pages'], 'wb') as f:
+        np.save(f, np.asarray(page_numbers, dtype=np.int32))
+
+    info = {'embedder': embedder.name, 'dim': int(vectors.shape[1]), 'passages': len(passages)}
+    with atomic_open(paths['info'], 'w') as f:
+        json.dump(info, f)
+    return info
+
+def release(paths) -> None:
+    """Drop cached mappings so the disk space of deleted index files is freed"""
+    with _cache_lock:
+        for path in paths:
+            _mmap_cache.pop(os.path.abspath(path), None)
+
+def _drop_missing() -> None:
+    # Files evicted by another worker's janitor stay allocated while mapped here
+    with _cache_lock:
+        for path in [p for p in _mmap_cache if not os.path.exists(p)]:
+            del _mmap_cache[path]
+
+def _load(path: str):
+    """Memory-map a saved array, reusing the mapping until the file is replaced"""
+    import numpy as np
+
+    path = os.path.abspath(path)
+    try:
+        mtime = os.path.getmtime(path)
+    except FileNotFoundError:
+        release([path])
+        raise
+    with _cache_lock:
+        cached = _mmap_cache.get(path)
+        if cached and cached[0] == mtime:
+            _mmap_cache.move_to_end(path)
+            return cached[1]
+    array = np.load(path, mmap_mode='r')
+    with _cache_lock:
+        _mmap_cache[path] = (mtime, array)
+        _mmap_cache.move_to_end(path)
+        while len(_mmap_cache) > MAX_CACHED_ARRAYS:
+            _mmap_cache.popitem(last=False)
+    return array
+
+def search(paths: Dict[str, str], query: str, k: int = 5) -> List[Dict]:
+    """Top-k pages by cosine similarity of their best passage to the query"""
+    import numpy as np
+
+    with open(paths['info'], 'r') as f:
+        info = json.load(f)
+    if not info['passages']:
+        return []
+
+    _drop_missing()
+    vectors = _load(paths['vectors'])
+    page_numbers = _load(paths['pages'])
+    query_vector = get_embedder(info['embedder']).embed([query])[0]
+
+    # Rows are unit length, so the dot product is the cosine similarity
+    scores = vectors @ query_vector
+
+    # Take extra passages since several may come from the same page
+    top_n = min(len(scores), k * 4)
+    top = np.argpartition(-scores, top_n - 1)[:top_n]
+    top = top[np.argsort(-scores[top])]
+
+    results, seen = [], set()
+    for row in top:
+        page = int(page_numbers[row])
+        if page in seen:
+            continue
+        seen.add(page)
+        results.append({'pageNumber': page, 'score': round(float(scores[row]), 4)})
+        if len(results) == k:
+            break
+    return results
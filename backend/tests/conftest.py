@@ -0,0 +1,47 @@
+import importlib
+import importlib.util
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UTILS_DIR = os.path.join(BACKEND_DIR, 'app', 'utils')
+UTILS_PACKAGE = 'app_utils'
+
+def load_util(name):
+    """Import an app/utils module without importing the app package
+
+    Importing through the app package would run create_app() (state
+    database, janitor thread) as a side effect. The utils folder is loaded
+    as a standalone package so relative imports between utils still work.
+    """
+    if UTILS_PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            UTILS_PACKAGE, os.path.join(UTILS_DIR, '__init__.py'), submodule_search_locations=[UTILS_DIR]
+        )
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[UTILS_PACKAGE] = package
+        spec.loader.exec_module(package)
+    return importlib.import_module(f"{UTILS_PACKAGE}.{name}")
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client for an app whose uploads folder is a fresh temporary directory"""
+    monkeypatch.setenv('UPLOAD_FOLDER', str(tmp_path))
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from app import create_app
+    app = create_app()
+    return app.test_client()
+
+def add_document(folder, filename, data):
+    """Store a document and its metadata as an upload would, without extracting it"""
+    import hashlib
+    import json
+    file_hash = hashlib.sha256(data).hexdigest()
+    with open(os.path.join(folder, filename), 'wb') as f:
+        f.write(data)
+    with open(os.path.join(folder, f"{filename}_metadata.json"), 'w') as f:
+        json.dump({'filename': filename, 'hash': file_hash}, f)
+    return file_hash
@@ -0,0 +1,196 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from conftest import load_util
+
+admission = load_util('admission')
+
+def make_controller(**overrides):
+    options = dict(max_active=4, per_client_active=1, per_client_queue=4, max_queue=16,
+                   rate=100.0, burst=100, queue_timeout=5)
+    options.update(overrides)
+    return admission.AdmissionController(**options)
+
+def wait_until(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('Condition not reached in time')
+        time.sleep(0.005)
+
+def start_acquire(controller, client, granted, errors=None):
+    """Acquire in a background thread; records the client in `granted` once admitted"""
+    def run():
+        try:
+            controller.acquire(client)
+            granted.append(client)
+        except admission.AdmissionRejected as e:
+            if errors is None:
+                raise
+            errors.append(e)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def test_per_client_cap_queues_extra_requests():
+    controller = make_controller()
+    granted = []
+    controller.acquire('a')
+
+    # Global slots are free, but "a" is at its cap
+    start_acquire(controller, 'a', granted)
+    wait_until(lambda: controller.queued == 1)
+    assert granted == []
+
+    # Another client is admitted straight past the queued request
+    start_acquire(controller, 'b', granted)
+    wait_until(lambda: granted == ['b'])
+
+    controller.release('a', 0.1)
+    wait_until(lambda: granted == ['b', 'a'])
+    assert controller.client_active == {'a': 1, 'b': 1}
+    assert controller.queued == 0
+
+def test_freed_slots_are_dispatched_round_robin():
+    controller = make_controller(max_active=1)
+    granted = []
+    controller.acquire('x')
+
+    # Queue a1, a2, b1 in that order
+    for client, queued in [('a', 1), ('a', 2), ('b', 3)]:
+        start_acquire(controller, client, granted)
+        wait_until(lambda: controller.queued == queued)
+
+    controller.release('x', 0.1)
+    wait_until(lambda: granted == ['a'])
+    controller.release('a', 0.1)
+    # b gets the next slot even though a queued its second request earlier
+    wait_until(lambda: granted == ['a', 'b'])
+    controller.release('b', 0.1)
+    wait_until(lambda: granted == ['a', 'b', 'a'])
+
+def test_rejects_when_queue_is_full():
+    controller = make_controller(max_active=1, max_queue=1)
+    granted = []
+    controller.acquire('x')
+    start_acquire(controller, 'a', granted)
+    wait_until(lambda: controller.queued == 1)
+
+    with pytest.raises(admission.AdmissionRejected) as excinfo:
+        controller.acquire('b')
+    assert excinfo.value.reason == 'Too many requests queued'
+    assert excinfo.value.retry_after >= 1
+
+def test_rate_limit_rejects_after_burst():
+    controller = make_controller(rate=0.5, burst=2, per_client_active=10)
+    controller.acquire('a')
+    controller.acquire('a')
+    with pytest.raises(admission.AdmissionRejected) as excinfo:
+        controller.acquire('a')
+    assert excinfo.value.reason == 'Rate limit exceeded'
+    assert excinfo.value.retry_after >= 1
+
+def test_timed_out_waiter_leaves_queue():
+    controller = make_controller(max_active=1, queue_timeout=0.05)
+    controller.acquire('x')
+    with pytest.raises(admission.AdmissionRejected) as excinfo:
+        controller.acquire('a')
+    assert excinfo.value.reason == 'Timed out waiting for capacity'
+    assert controller.queued == 0
+    assert not controller.waiters
+    assert controller.active == 1
+
+def test_slot_granted_after_wait_timeout_is_kept():
+    # Reentrant lock so the test can release while holding it
+    controller = make_controller(max_active=1, queue_timeout=0.5)
+    controller.lock = threading.RLock()
+    granted, errors = [], []
+    controller.acquire('x')
+    start_acquire(controller, 'a', granted, errors)
+    wait_until(lambda: controller.queued == 1)
+
+    with controller.lock:
+        # Let the wait time out; the waiter then blocks on the lock we hold
+        time.sleep(0.8)
+        controller.release('x', 0.1)
+
+    wait_until(lambda: granted or errors)
+    # The grant won the race: the waiter proceeds instead of leaking the slot
+    assert granted == ['a'] and errors == []
+    assert controller.active == 1
+    assert controller.client_active == {'a': 1}
+    controller.release('a', 0.1)
+    assert controller.active == 0 and controller.client_active == {}
+
+def make_app(controller, **config):
+    app = Flask(__name__)
+    app.config.update(dict(ADMISSION_TRUST_FORWARDED=False, ADMISSION_TRUST_CLIENT_ID=False), **config)
+    app.extensions['admission'] = controller
+
+    @app.route('/work')
+    @admission.admission_controlled
+    def work():
+        return 'ok'
+
+    return app
+
+def test_queue_full_returns_429_with_retry_after():
+    controller = make_controller(max_active=1, max_queue=0)
+    controller.acquire('127.0.0.1')
+    client = make_app(controller).test_client()
+
+    response = client.get('/work')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+    controller.release('127.0.0.1', 0.1)
+    response = client.get('/work')
+    assert response.status_code == 200
+    response.close()
+    assert controller.active == 0
+
+def test_client_id_header_needs_trust():
+    controller = make_controller(max_active=1, max_queue=0)
+    controller.acquire('127.0.0.1')
+
+    client = make_app(controller).test_client()
+    assert client.get('/work', headers={'X-Client-Id': 'fresh'}).status_code == 429
+
+    client = make_app(controller, ADMISSION_TRUST_CLIENT_ID=True).test_client()
+    controller.max_active = 2
+    response = client.get('/work', headers={'X-Client-Id': 'fresh'})
+    assert response.status_code == 200
+    response.close()
+
+def test_limits_fit_in_worker_threads():
+    config = dict(ADMISSION_MAX_ACTIVE=16, ADMISSION_MAX_QUEUE=64,
+                  ADMISSION_WORKER_THREADS=8, ADMISSION_RESERVED_THREADS=2)
+    assert admission.thread_limits(config) == (6, 0)
+
+    config.update(ADMISSION_MAX_ACTIVE=4, ADMISSION_MAX_QUEUE=64)
+    assert admission.thread_limits(config) == (4, 2)
+
+    config.update(ADMISSION_WORKER_THREADS=1)
+    assert admission.thread_limits(config) == (1, 0)
+
+def test_queue_fills_before_threads_run_out():
+    config = dict(ADMISSION_MAX_ACTIVE=4, ADMISSION_MAX_QUEUE=2,
+                  ADMISSION_WORKER_THREADS=8, ADMISSION_RESERVED_THREADS=2)
+    max_active, max_queue = admission.thread_limits(config)
+    controller = make_controller(max_active=max_active, max_queue=max_queue, per_client_active=1)
+    granted = []
+    for i in range(max_active):
+        controller.acquire(f"active-{i}")
+    for i in range(max_queue):
+        start_acquire(controller, f"queued-{i}", granted)
+    wait_until(lambda: controller.queued == max_queue)
+
+    # Six threads are busy; the next request is rejected instead of taking a seventh
+    with pytest.raises(admission.AdmissionRejected):
+        controller.acquire('another')
+    for i in range(max_active):
+        controller.release(f"active-{i}", 0.1)
+    wait_until(lambda: len(granted) == max_queue)
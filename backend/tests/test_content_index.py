@@ -0,0 +1,41 @@
+from conftest import load_util
+
+content_index = load_util('content_index')
+
+PAGES = [
+    'First page',
+    'Ünïcödé — “quotes”, 数学 and 🧪 emoji',
+    '',
+    'Trailing blank lines\n\n',
+    'Last page',
+]
+
+def write(tmp_path, pages):
+    text_path, index_path = content_index.content_paths(str(tmp_path), 'doc.pdf')
+    content_index.write_content(text_path, index_path, pages)
+    return text_path, index_path
+
+def test_round_trips_every_page(tmp_path):
+    text_path, index_path = write(tmp_path, PAGES)
+    assert content_index.page_count(index_path) == len(PAGES)
+    assert content_index.read_pages(text_path, index_path, 1, len(PAGES)) == PAGES
+
+def test_reads_single_pages_by_byte_offset(tmp_path):
+    text_path, index_path = write(tmp_path, PAGES)
+    for number, page in enumerate(PAGES, start=1):
+        assert content_index.read_pages(text_path, index_path, number, number) == [page]
+
+def test_reads_ranges_after_multibyte_pages(tmp_path):
+    text_path, index_path = write(tmp_path, PAGES)
+    assert content_index.read_pages(text_path, index_path, 2, 4) == PAGES[1:4]
+    assert content_index.read_pages(text_path, index_path, 4, 5) == PAGES[3:5]
+
+def test_all_empty_pages(tmp_path):
+    text_path, index_path = write(tmp_path, ['', ''])
+    assert content_index.page_count(index_path) == 2
+    assert content_index.read_pages(text_path, index_path, 1, 2) == ['', '']
+
+def test_zero_page_document(tmp_path):
+    text_path, index_path = write(tmp_path, [])
+    assert content_index.page_count(index_path) == 0
+    assert content_index.read_pages(text_path, index_path, 1, 1) == []
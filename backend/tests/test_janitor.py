@@ -0,0 +1,103 @@
+import os
+import time
+
+import pytest
+
+from conftest import load_util
+
+state = load_util('state')
+janitor_module = load_util('janitor')
+
+KB = 1024
+
+@pytest.fixture
+def store(tmp_path):
+    return state.StateStore(str(tmp_path / 'state.db'))
+
+def make_janitor(store, tmp_path, quota_kb=1000, audio_max_age=3600):
+    return janitor_module.Janitor(store, str(tmp_path), quota_bytes=quota_kb * KB,
+                                  interval=300, audio_max_age=audio_max_age)
+
+def add_files(tmp_path, store, group, names, age, size_kb=100):
+    """Write files of size_kb and register them as last used `age` seconds ago"""
+    for name in names:
+        (tmp_path / name).write_bytes(b'x' * size_kb * KB)
+    store.track_artifacts([(name, group, size_kb * KB, time.time() - age) for name in names])
+
+def exists(tmp_path, name):
+    return os.path.exists(tmp_path / name)
+
+def test_evicts_least_recently_used_documents_until_under_quota(tmp_path, store):
+    add_files(tmp_path, store, 'old.pdf', ['old.pdf', 'old.pdf_content.txt'], age=300)
+    add_files(tmp_path, store, 'mid.pdf', ['mid.pdf', 'mid.pdf_content.txt'], age=200)
+    add_files(tmp_path, store, 'new.pdf', ['new.pdf', 'new.pdf_content.txt'], age=100)
+    janitor = make_janitor(store, tmp_path, quota_kb=400)
+
+    result = janitor.sweep()
+    assert result['evicted_groups'] == ['old.pdf']
+    assert result['freed_bytes'] == 200 * KB
+    assert not exists(tmp_path, 'old.pdf') and not exists(tmp_path, 'old.pdf_content.txt')
+    assert exists(tmp_path, 'mid.pdf') and exists(tmp_path, 'new.pdf')
+    assert janitor.usage() == 400 * KB
+
+def test_touch_refreshes_recency(tmp_path, store):
+    add_files(tmp_path, store, 'old.pdf', ['old.pdf'], age=300)
+    add_files(tmp_path, store, 'new.pdf', ['new.pdf'], age=100)
+    janitor = make_janitor(store, tmp_path, quota_kb=100)
+
+    janitor.touch('old.pdf')
+    assert janitor.sweep()['evicted_groups'] == ['new.pdf']
+
+def test_current_document_is_never_evicted(tmp_path, store):
+    add_files(tmp_path, store, 'current.pdf', ['current.pdf'], age=300)
+    add_files(tmp_path, store, 'other.pdf', ['other.pdf'], age=100)
+    store.set_current_document('current.pdf')
+    janitor = make_janitor(store, tmp_path, quota_kb=100)
+
+    assert janitor.sweep()['evicted_groups'] == ['other.pdf']
+    assert exists(tmp_path, 'current.pdf')
+    # Still over quota with only the current document left: it stays
+    janitor.quota_bytes = 0
+    assert janitor.sweep()['evicted_groups'] == []
+    assert exists(tmp_path, 'current.pdf')
+
+def test_expires_old_audio_under_quota(tmp_path, store):
+    add_files(tmp_path, store, janitor_module.audio_group('stale.mp3'), ['stale.mp3'], age=7200, size_kb=1)
+    add_files(tmp_path, store, janitor_module.audio_group('fresh.mp3'), ['fresh.mp3'], age=10, size_kb=1)
+    janitor = make_janitor(store, tmp_path)
+
+    result = janitor.sweep()
+    assert result['expired_audio'] == 1 and result['evicted_groups'] == []
+    assert not exists(tmp_path, 'stale.mp3')
+    assert exists(tmp_path, 'fresh.mp3')
+
+def test_audio_is_evicted_one_file_at_a_time_oldest_first(tmp_path, store):
+    add_files(tmp_path, store, janitor_module.audio_group('a.mp3'), ['a.mp3'], age=300)
+    add_files(tmp_path, store, janitor_module.audio_group('b.mp3'), ['b.mp3'], age=200)
+    add_files(tmp_path, store, janitor_module.audio_group('just_written.mp3'), ['just_written.mp3'], age=0)
+    janitor = make_janitor(store, tmp_path, quota_kb=200)
+
+    assert janitor.sweep()['evicted_groups'] == [janitor_module.audio_group('a.mp3')]
+    assert exists(tmp_path, 'b.mp3') and exists(tmp_path, 'just_written.mp3')
+
+def test_purge_removes_every_tracked_file(tmp_path, store):
+    add_files(tmp_path, store, 'doc.pdf', ['doc.pdf', 'doc.pdf_content.txt'], age=0)
+    store.set_current_document('doc.pdf')
+    janitor = make_janitor(store, tmp_path)
+
+    assert janitor.purge() == {'freed_bytes': 200 * KB}
+    assert not exists(tmp_path, 'doc.pdf') and janitor.usage() == 0
+
+def test_cleanup_route_sweeps_by_default_and_purges_when_forced(client, tmp_path):
+    (tmp_path / 'doc.pdf').write_bytes(b'%PDF-1.4')
+    with client.application.app_context():
+        client.application.extensions['janitor'].track([str(tmp_path / 'doc.pdf')], group='doc.pdf')
+
+    response = client.post('/api/pdf/cleanup')
+    assert response.status_code == 200
+    assert response.get_json()['evicted_groups'] == []
+    assert exists(tmp_path, 'doc.pdf')
+
+    response = client.post('/api/pdf/cleanup?force=true')
+    assert response.get_json()['freed_bytes'] == len(b'%PDF-1.4')
+    assert not exists(tmp_path, 'doc.pdf')
@@ -0,0 +1,65 @@
+from conftest import load_util
+
+normalize = load_util('normalize')
+
+def make_pages(count=10):
+    return [
+        f"Thermodynamics {page}\n"
+        f"Problem {page} asks for the heat absorbed by the gas at constant pressure.\n"
+        "Body text that stays on the page.\n"
+        f"Example {page}.4 shows the result in {page + 2} steps after the expansion.\n"
+        f"{page}"
+        for page in range(1, count + 1)
+    ]
+
+def test_running_header_with_page_number_is_removed():
+    pages, stats = normalize.normalize_pages(make_pages())
+    assert stats == {'running_lines_removed': 10, 'page_numbers_removed': 10}
+    assert pages[2].startswith('Problem 3 asks')
+
+def test_numbered_body_lines_at_page_edges_are_kept():
+    pages, _ = normalize.normalize_pages(make_pages())
+    for number, page in enumerate(pages, start=1):
+        lines = page.split('\n')
+        assert lines[0] == f"Problem {number} asks for the heat absorbed by the gas at constant pressure."
+        assert lines[-1] == f"Example {number}.4 shows the result in {number + 2} steps after the expansion."
+
+def test_short_numbered_lines_only_match_on_edge_numbers():
+    assert normalize._line_key('Chapter 3 Waves 45') == normalize._line_key('Chapter 3 Waves 46')
+    assert normalize._line_key('Example 3.4 Waves') != normalize._line_key('Example 3.5 Waves')
+    assert normalize._line_key('one two three four five six seven eight nine') == ''
+
+def test_edge_words_and_lone_numbers_are_not_page_numbers():
+    pages = [
+        'Civil\nThe body of the first page.\nIll',
+        'Lix\nThe body of the second page.\n42',
+        'The body of the third page.\nAnswer:\n7',
+    ]
+    normalized, stats = normalize.normalize_pages(pages)
+    assert stats['page_numbers_removed'] == 0
+    assert normalized == [page for page in pages]
+
+def test_page_number_sequences_are_removed():
+    pages = [f"Body of page {n}.\n{n}" for n in range(11, 16)]
+    pages[2] = 'A full-page figure with no number'
+    normalized, stats = normalize.normalize_pages(pages)
+    assert stats['page_numbers_removed'] == 4
+    assert normalized[0] == 'Body of page 11.'
+    assert normalized[3] == 'Body of page 14.'
+
+def test_lowercase_roman_front_matter_numbers_are_removed():
+    pages = [f"Preface text {n}.\n{numeral}" for n, numeral in enumerate(['i', 'ii', 'iii', 'iv'])]
+    pages += ['Chapter body.\nIII', 'More body.\nIV']
+    normalized, stats = normalize.normalize_pages(pages)
+    assert stats['page_numbers_removed'] == 4
+    assert normalized[:4] == [f"Preface text {n}." for n in range(4)]
+    assert normalized[4:] == ['Chapter body.\nIII', 'More body.\nIV']
+
+def test_hyphen_kept_unless_joined_word_occurs_elsewhere():
+    pages = [
+        'Heat flow is a well-\nknown topic in ther-\nmodynamics.',
+        'Use the self-\nassessment at the end. Thermodynamics is the study of heat.',
+    ]
+    normalized, _ = normalize.normalize_pages(pages)
+    assert normalized[0] == 'Heat flow is a well-known topic in thermodynamics.'
+    assert normalized[1].startswith('Use the self-assessment at the end.')
@@ -0,0 +1,54 @@
+import pytest
+
+from conftest import load_util
+
+outline = load_util('outline')
+canvas = pytest.importorskip('reportlab.pdfgen.canvas')
+pytest.importorskip('PyPDF2')
+
+TITLES = ['Heat', 'Light', 'Sound', 'Motion']
+
+def make_book(path, running_header):
+    """4 chapters of 8 pages, 3 numbered sections each, page numbers in the footer"""
+    c = canvas.Canvas(str(path))
+    for chapter, title in enumerate(TITLES, start=1):
+        for page in range(8):
+            y = 780
+            if running_header:
+                c.setFont('Helvetica', 9)
+                c.drawString(50, 810, f"Chapter {chapter} {title}")
+            if page == 0:
+                c.setFont('Helvetica-Bold', 20)
+                c.drawString(50, y, f"Chapter {chapter} {title}")
+                y -= 40
+            if page in (1, 3, 5):
+                c.setFont('Helvetica-Bold', 14)
+                c.drawString(50, y, f"{chapter}.{(page + 1) // 2} {title} topic")
+                y -= 30
+            c.setFont('Helvetica', 11)
+            for line in range(25):
+                c.drawString(50, y, f"Body text about {title.lower()} line {line} with ordinary words")
+                y -= 16
+            c.setFont('Helvetica', 9)
+            c.drawString(300, 40, str((chapter - 1) * 8 + page + 1))
+            c.showPage()
+    c.save()
+
+def flatten(items):
+    result = []
+    for item in items:
+        result.append((item['level'], item['pageNumber'], item['title']))
+        result.extend(flatten(item['children']))
+    return result
+
+@pytest.mark.parametrize('running_header', [False, True])
+def test_chapters_and_sections_ignore_running_headers(tmp_path, running_header):
+    path = tmp_path / 'book.pdf'
+    make_book(path, running_header)
+
+    headings = flatten(outline.detect_outline(str(path)))
+    chapters = [h for h in headings if h[0] == 0]
+    sections = [h for h in headings if h[0] == 1]
+    assert chapters == [(0, 1 + 8 * i, f"Chapter {i + 1} {title}") for i, title in enumerate(TITLES)]
+    assert len(sections) == 12
+    assert sections[0] == (1, 2, '1.1 Heat topic')
@@ -0,0 +1,63 @@
+import pytest
+
+from conftest import add_document
+
+PDF_BYTES = b'%PDF-1.4\n' + b'0' * 1000 + b'\n%%EOF\n'
+
+def test_full_response_advertises_ranges(client, tmp_path):
+    file_hash = add_document(tmp_path, 'doc.pdf', PDF_BYTES)
+    response = client.get('/api/pdf/file/doc.pdf')
+    assert response.status_code == 200
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['ETag'] == f'"{file_hash}"'
+    assert response.data == PDF_BYTES
+
+def test_range_request_returns_partial_content(client, tmp_path):
+    add_document(tmp_path, 'doc.pdf', PDF_BYTES)
+    response = client.get('/api/pdf/file/doc.pdf', headers={'Range': 'bytes=0-99'})
+    assert response.status_code == 206
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Range'] == f'bytes 0-99/{len(PDF_BYTES)}'
+    assert response.data == PDF_BYTES[:100]
+
+def test_versioned_url_is_immutable_and_revalidates(client, tmp_path):
+    file_hash = add_document(tmp_path, 'doc.pdf', PDF_BYTES)
+    response = client.get(f'/api/pdf/file/doc.pdf?v={file_hash}')
+    assert 'immutable' in response.headers['Cache-Control']
+    response = client.get('/api/pdf/file/doc.pdf', headers={'If-None-Match': f'"{file_hash}"'})
+    assert response.status_code == 304
+
+def test_only_uploaded_pdfs_are_served(client, tmp_path):
+    add_document(tmp_path, 'doc.pdf', PDF_BYTES)
+    (tmp_path / 'stray.pdf').write_bytes(PDF_BYTES)
+    assert client.get('/api/pdf/file/state.db').status_code == 404
+    assert client.get('/api/pdf/file/doc.pdf_metadata.json').status_code == 404
+    assert client.get('/api/pdf/file/stray.pdf').status_code == 404
+    assert client.get('/api/pdf/file/doc.pdf').status_code == 200
+
+def test_upload_keeps_raw_text_next_to_normalized_text(client, tmp_path):
+    import io
+    canvas = pytest.importorskip('reportlab.pdfgen.canvas')
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for number in range(1, 5):
+        pdf.drawString(50, 750, f"Body text of page {number} about heat.")
+        pdf.drawString(300, 40, str(number))
+        pdf.showPage()
+    pdf.save()
+    buffer.seek(0)
+
+    response = client.post('/api/pdf/upload', data={'file': (buffer, 'book.pdf')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    filename = response.get_json()['filename']
+    assert response.get_json()['metadata']['normalization']['page_numbers_removed'] == 4
+
+    raw = (tmp_path / f"{filename}_raw_content.txt").read_text()
+    normalized = (tmp_path / f"{filename}_content.txt").read_text()
+    assert 'heat.\n4' in raw
+    assert '\n4' not in normalized and 'Body text of page 4 about heat.' in normalized
+    with client.application.app_context():
+        tracked = client.application.extensions['state'].conn.execute(
+            'SELECT name FROM artifacts WHERE grp = ?', (filename,)).fetchall()
+    assert (f"{filename}_raw_content.txt",) in tracked
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from conftest import add_document, load_util
+
+content_index = load_util('content_index')
+
+PAGE_COUNT = 10
+TOC = [
+    {'title': 'Chapter 1', 'pageNumber': 1, 'level': 0, 'children': []},
+    {'title': 'Chapter 2', 'pageNumber': 4, 'level': 0, 'children': [
+        {'title': '2.1 Section', 'pageNumber': 5, 'level': 1, 'children': []}
+    ]},
+    {'title': 'Chapter 3', 'pageNumber': 8, 'level': 0, 'children': []},
+]
+
+@pytest.fixture
+def answers(client, tmp_path, monkeypatch):
+    """Current document with ingestion artifacts only; the PDF bytes are not parseable"""
+    from app.routes import qa_routes
+
+    add_document(tmp_path, 'doc.pdf', b'not a parseable pdf')
+    text_path, index_path = content_index.content_paths(str(tmp_path), 'doc.pdf')
+    content_index.write_content(text_path, index_path, [f"Text of page {n}" for n in range(1, PAGE_COUNT + 1)])
+    with open(os.path.join(tmp_path, 'doc.pdf_toc.json'), 'w') as f:
+        json.dump({'toc': TOC}, f)
+    with client.application.app_context():
+        client.application.extensions['state'].set_current_document('doc.pdf')
+
+    calls = []
+
+    def fake_answer(client, context, chunks, question):
+        calls.append({'context': context, 'text': ''.join(chunks), 'question': question})
+        return f"answer to {question}"
+
+    monkeypatch.setattr(qa_routes, 'answer_from_chunks', fake_answer)
+    monkeypatch.setattr(qa_routes, 'count_tokens', lambda text: len(text.split()))
+    monkeypatch.setattr(qa_routes, 'get_openai_client', lambda: None)
+    return calls
+
+def test_ask_uses_page_window_from_ingestion_index(client, answers):
+    response = client.post('/api/qa/ask', json={'question': 'What is this?', 'page': 5})
+    assert response.status_code == 200
+    assert answers[0]['context'] == 'text from pages 4 to 6'
+    assert 'Text of page 4' in answers[0]['text'] and 'Text of page 7' not in answers[0]['text']
+
+def test_chapter_questions_use_stored_toc(client, answers):
+    response = client.post('/api/qa/ask', json={'question': 'Summarize this chapter', 'page': 5})
+    assert response.status_code == 200
+    assert answers[0]['context'] == 'text from Chapter pages 4 to 7'
+
+def test_ask_rejects_pages_outside_document(client, answers):
+    response = client.post('/api/qa/ask', json={'question': 'What is this?', 'page': PAGE_COUNT + 1})
+    assert response.status_code == 400
+    assert f'{PAGE_COUNT} pages' in response.get_json()['error']
+
+def test_batch_groups_by_page_window(client, answers):
+    response = client.post('/api/qa/batch', json={'questions': [
+        {'question': 'First?', 'page': 2}, {'question': 'Second?', 'page': 2},
+        {'question': 'What is in this chapter?', 'page': 9}
+    ]})
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert lines[-1] == {'done': True, 'answered': 3, 'failed': 0}
+    assert sorted(call['context'] for call in answers) == [
+        'text from Chapter pages 8 to 10', 'text from pages 1 to 3', 'text from pages 1 to 3'
+    ]
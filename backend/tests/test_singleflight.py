@@ -0,0 +1,109 @@
+import threading
+import time
+
+from conftest import load_util
+
+singleflight = load_util('singleflight')
+
+WAITERS = 5
+
+def wait_until(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('Condition not reached in time')
+        time.sleep(0.005)
+
+def run_concurrently(flight, key, fn, count, timeout=None):
+    """Start `count` callers of flight.do; returns (threads, outcomes)"""
+    outcomes = []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            result = ('result', flight.do(key, fn, timeout))
+        except Exception as e:
+            result = ('error', e)
+        with lock:
+            outcomes.append(result)
+
+    threads = [threading.Thread(target=call, daemon=True) for _ in range(count)]
+    threads[0].start()
+    # Start the others once the leader's call is in flight
+    wait_until(lambda: key in flight.calls)
+    for thread in threads[1:]:
+        thread.start()
+    wait_until(lambda: flight.calls[key].waiters == count - 1)
+    return threads, outcomes
+
+def join(threads):
+    for thread in threads:
+        thread.join(2)
+        assert not thread.is_alive()
+
+def test_concurrent_callers_share_one_call():
+    flight = singleflight.SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(2)
+        return {'answer': 42}
+
+    threads, outcomes = run_concurrently(flight, 'k', upstream, WAITERS)
+    release.set()
+    join(threads)
+
+    assert len(calls) == 1
+    assert outcomes == [('result', {'answer': 42})] * WAITERS
+    # Nothing is cached once the call finishes
+    assert flight.do('k', lambda: 'fresh') == 'fresh'
+
+def test_error_is_raised_in_every_waiter():
+    flight = singleflight.SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(2)
+        raise ValueError('upstream failed')
+
+    threads, outcomes = run_concurrently(flight, 'k', upstream, WAITERS)
+    release.set()
+    join(threads)
+
+    assert len(calls) == 1
+    assert len(outcomes) == WAITERS
+    for kind, error in outcomes:
+        assert kind == 'error'
+        assert isinstance(error, ValueError) and str(error) == 'upstream failed'
+    assert not flight.calls
+
+def test_waiter_times_out_while_leader_continues():
+    flight = singleflight.SingleFlight()
+    release = threading.Event()
+
+    def upstream():
+        release.wait(2)
+        return 'done'
+
+    threads, outcomes = run_concurrently(flight, 'k', upstream, 2, timeout=0.05)
+    threads[1].join(2)
+    assert outcomes[0][0] == 'error'
+    assert isinstance(outcomes[0][1], singleflight.FlightTimeout)
+
+    release.set()
+    join(threads)
+    assert outcomes[1] == ('result', 'done')
+
+def test_different_keys_do_not_coalesce():
+    flight = singleflight.SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+
+def test_request_key_is_stable():
+    key = singleflight.request_key('voice', {'text': 'hi', 'model': 'm'})
+    assert key == singleflight.request_key('voice', {'model': 'm', 'text': 'hi'})
+    assert key != singleflight.request_key('other', {'text': 'hi', 'model': 'm'})
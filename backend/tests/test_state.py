@@ -0,0 +1,32 @@
+import json
+
+from conftest import load_util
+
+state = load_util('state')
+
+def test_imports_legacy_history_files_once(tmp_path):
+    entries = [
+        {'question': 'What is heat?', 'answer': 'Energy in transit.', 'timestamp': '2024-01-01T10:00:00'},
+        {'question': 'And work?', 'answer': 'Force times distance.', 'timestamp': '2024-01-01T10:01:00'},
+    ]
+    (tmp_path / 'book.pdf_qa_history.json').write_text(json.dumps(entries))
+    (tmp_path / 'broken.pdf_qa_history.json').write_text('{not json')
+    store = state.StateStore(str(tmp_path / 'state.db'))
+
+    assert store.import_legacy_history(str(tmp_path)) == 2
+    assert store.history('book.pdf') == entries
+    assert (tmp_path / 'book.pdf_qa_history.json.imported').exists()
+    assert not (tmp_path / 'book.pdf_qa_history.json').exists()
+    # Unreadable files are left in place for inspection
+    assert (tmp_path / 'broken.pdf_qa_history.json').exists()
+
+    assert store.import_legacy_history(str(tmp_path)) == 0
+    assert len(store.history('book.pdf')) == 2
+
+def test_history_route_serves_imported_entries(client, tmp_path):
+    # The client fixture's app imported nothing yet; a new app picks the file up at startup
+    entry = {'question': 'Q?', 'answer': 'A.', 'timestamp': '2024-01-01T10:00:00'}
+    (tmp_path / 'old.pdf_qa_history.json').write_text(json.dumps([entry]))
+    from app import create_app
+    app = create_app()
+    assert app.test_client().get('/api/qa/history/old.pdf').get_json() == {'history': [entry]}
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from conftest import load_util
+
+pytest.importorskip('numpy')
+vector_index = load_util('vector_index')
+
+TOPICS = ['photosynthesis chloroplast sunlight glucose', 'orbit planet gravity comet',
+          'treaty empire king war', 'market price supply demand']
+
+def build(folder, name, topic_page=3, pages=6):
+    texts = [f"general review material page {p} " * 20 for p in range(pages)]
+    texts[topic_page - 1] = f"{TOPICS[0]} " * 20
+    paths = vector_index.index_paths(str(folder), name)
+    vector_index.build_index(paths, texts, 'hashing')
+    return paths
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    vector_index._mmap_cache.clear()
+    yield
+    vector_index._mmap_cache.clear()
+
+def test_search_ranks_matching_page_first(tmp_path):
+    paths = build(tmp_path, 'a.pdf', topic_page=4)
+    results = vector_index.search(paths, 'how do chloroplast cells use sunlight', k=3)
+    assert results[0]['pageNumber'] == 4
+    assert len({r['pageNumber'] for r in results}) == len(results)
+
+def test_cache_is_bounded(tmp_path):
+    for i in range(vector_index.MAX_CACHED_ARRAYS):
+        vector_index.search(build(tmp_path, f"{i}.pdf"), 'sunlight', k=1)
+    assert len(vector_index._mmap_cache) == vector_index.MAX_CACHED_ARRAYS
+    assert str(tmp_path / '0.pdf_vectors.npy') not in vector_index._mmap_cache
+
+def test_deleted_index_files_are_released(tmp_path):
+    kept, evicted = build(tmp_path, 'kept.pdf'), build(tmp_path, 'evicted.pdf')
+    vector_index.search(evicted, 'sunlight', k=1)
+
+    # Evicted by another process: dropped on the next search
+    os.remove(evicted['vectors'])
+    os.remove(evicted['pages'])
+    vector_index.search(kept, 'sunlight', k=1)
+    assert set(vector_index._mmap_cache) == {kept['vectors'], kept['pages']}
+
+    # Evicted by this process's janitor: released explicitly
+    vector_index.release([kept['vectors'], kept['pages']])
+    assert not vector_index._mmap_cache
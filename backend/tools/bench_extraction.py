@@ -0,0 +1,59 @@
+"""
+Compare text extraction backends on a PDF.
+
+Runs every backend (or those given with --backends) over the same file and
+reports time, pages, characters and whether the output passes the quality
+check used for automatic backend selection.
+
+    python tools/bench_extraction.py textbook.pdf --runs 3
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import time
+
+# Load the extraction module by path: importing the app package would run
+# create_app() (state database, janitor thread, startup banner)
+EXTRACTION_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'utils', 'extraction.py'
+)
+_spec = importlib.util.spec_from_file_location('extraction', EXTRACTION_PATH)
+extraction = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(extraction)
+BACKENDS, BackendUnavailable = extraction.BACKENDS, extraction.BackendUnavailable
+is_acceptable, parse_backends = extraction.is_acceptable, extraction.parse_backends
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PDF text extraction backends')
+    parser.add_argument('pdf')
+    parser.add_argument('--backends', default=','.join(BACKENDS))
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"\n=== Extraction Benchmark: {os.path.basename(args.pdf)} ===")
+    print(f"{'backend':<10}{'median ms':>12}{'ms/page':>10}{'pages':>8}{'chars':>10}  acceptable")
+    for name in parse_backends(args.backends):
+        times, pages = [], None
+        try:
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                pages = BACKENDS[name](args.pdf)
+                times.append(time.perf_counter() - start)
+        except BackendUnavailable as e:
+            print(f"{name:<10}  unavailable ({e})")
+            continue
+        except Exception as e:
+            print(f"{name:<10}  error ({e})")
+            continue
+
+        median_ms = statistics.median(times) * 1000
+        chars = sum(len(page) for page in pages)
+        print(f"{name:<10}{median_ms:>12.0f}{median_ms / max(1, len(pages)):>10.1f}"
+              f"{len(pages):>8}{chars:>10}  {'yes' if is_acceptable(pages) else 'no'}")
+    print()
+
+
+if __name__ == '__main__':
+    main()
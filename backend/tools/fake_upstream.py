@@ -0,0 +1,200 @@
+"""
+Local stand-in for the OpenAI and ElevenLabs APIs.
+
+Lets the backend be load-tested without spending real API quota. Point the
+backend at it with:
+
+    OPENAI_BASE_URL=http://localhost:8100/v1
+    ELEVENLABS_BASE_URL=http://localhost:8100
+
+and run:
+
+    python tools/fake_upstream.py --latency-ms 800 --jitter-ms 300 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+app = Flask(__name__)
+
+# Simulation settings, overridden from the command line
+settings = {
+    'latency_ms': 500.0,
+    'jitter_ms': 200.0,
+    'error_rate': 0.0,
+    'chunk_delay_ms': 30.0,
+    'answer_words': 120,
+    'audio_bytes_per_char': 60,
+}
+
+LOREM = (
+    "The chapter explains how the concept builds on earlier material and "
+    "illustrates it with worked examples that highlight the key definitions "
+    "and results students are expected to remember"
+).split()
+
+FAKE_VOICES = [
+    {'voice_id': 'fake-voice-1', 'name': 'Fake Narrator'},
+    {'voice_id': 'fake-voice-2', 'name': 'Fake Lecturer'},
+]
+
+
+def simulate_latency(scale=1.0):
+    """Sleep for the configured latency plus uniform jitter"""
+    delay = settings['latency_ms'] + random.uniform(-settings['jitter_ms'], settings['jitter_ms'])
+    time.sleep(max(0.0, delay * scale) / 1000.0)
+
+
+def maybe_rate_limit():
+    """Return a 429 response with the configured probability, otherwise None"""
+    if settings['error_rate'] and random.random() < settings['error_rate']:
+        response = jsonify({'error': {'message': 'Rate limit reached (fake upstream)', 'type': 'requests'}})
+        response.status_code = 429
+        response.headers['Retry-After'] = '1'
+        return response
+    return None
+
+
+def fake_answer(max_tokens):
+    """Build a deterministic-length fake answer"""
+    count = min(settings['answer_words'], max_tokens or settings['answer_words'])
+    return ' '.join(LOREM[i % len(LOREM)] for i in range(count))
+
+
+def count_prompt_words(messages):
+    return sum(len(str(m.get('content', '')).split()) for m in messages)
+
+
+@app.route('/v1/models', methods=['GET'])
+def list_models():
+    return jsonify({
+        'object': 'list',
+        'data': [{'id': 'gpt-3.5-turbo', 'object': 'model', 'created': 0, 'owned_by': 'fake'}]
+    })
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    """Emulate the chat completions endpoint, including SSE streaming"""
+    limited = maybe_rate_limit()
+    if limited is not None:
+        return limited
+
+    data = request.get_json(force=True) or {}
+    model = data.get('model', 'gpt-3.5-turbo')
+    answer = fake_answer(data.get('max_tokens'))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    if data.get('stream'):
+        def generate():
+            # Time to first token, then a steady trickle of tokens
+            simulate_latency(scale=0.3)
+            for i, word in enumerate(answer.split()):
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': created,
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'delta': {'role': 'assistant', 'content': word} if i == 0 else {'content': ' ' + word},
+                        'finish_reason': None
+                    }]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                time.sleep(settings['chunk_delay_ms'] / 1000.0)
+            final = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return Response(generate(), mimetype='text/event-stream')
+
+    simulate_latency()
+    prompt_tokens = count_prompt_words(data.get('messages', []))
+    completion_tokens = len(answer.split())
+    return jsonify({
+        'id': completion_id,
+        'object': 'chat.completion',
+        'created': created,
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': answer},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    })
+
+
+@app.route('/v1/voices', methods=['GET'])
+def list_voices():
+    simulate_latency(scale=0.2)
+    return jsonify({'voices': FAKE_VOICES})
+
+
+@app.route('/v1/text-to-speech/<voice_id>', methods=['POST'])
+def text_to_speech(voice_id):
+    """Emulate ElevenLabs TTS by returning a silent MP3-sized payload"""
+    limited = maybe_rate_limit()
+    if limited is not None:
+        return limited
+
+    data = request.get_json(force=True) or {}
+    text = data.get('text', '')
+    if not text:
+        return jsonify({'detail': 'text is required'}), 422
+
+    # Synthesis time grows with the length of the text
+    simulate_latency(scale=1.0 + len(text) / 2000.0)
+    size = max(1024, len(text) * settings['audio_bytes_per_char'])
+    # MPEG frame sync header followed by padding
+    audio = b'\xff\xfb\x90\x64' + b'\x00' * (size - 4)
+    return Response(audio, mimetype='audio/mpeg')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake OpenAI/ElevenLabs upstream for load testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--latency-ms', type=float, default=settings['latency_ms'],
+                        help='Mean response latency in milliseconds')
+    parser.add_argument('--jitter-ms', type=float, default=settings['jitter_ms'],
+                        help='Uniform jitter (+/-) added to the latency')
+    parser.add_argument('--error-rate', type=float, default=settings['error_rate'],
+                        help='Probability (0-1) of answering with HTTP 429')
+    parser.add_argument('--chunk-delay-ms', type=float, default=settings['chunk_delay_ms'],
+                        help='Delay between streamed completion chunks')
+    parser.add_argument('--answer-words', type=int, default=settings['answer_words'],
+                        help='Number of words in each fake completion')
+    args = parser.parse_args()
+
+    settings.update({
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'error_rate': args.error_rate,
+        'chunk_delay_ms': args.chunk_delay_ms,
+        'answer_words': args.answer_words,
+    })
+
+    print(f"\n=== Fake upstream on http://{args.host}:{args.port} ===")
+    print(f"Latency: {args.latency_ms}ms +/- {args.jitter_ms}ms, 429 rate: {args.error_rate}\n")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+End-to-end load generator for the Smart Textbook backend.
+
+Drives a weighted mix of upload/ask/chat/TTS requests against a running
+backend and reports throughput and p50/p95/p99 latency per operation.
+Run the backend against tools/fake_upstream.py to avoid using real quota:
+
+    python tools/load_test.py --pdf sample.pdf --concurrency 20 --duration 60 \\
+        --mix ask=5,chat=3,tts=2,upload=0
+
+Each worker thread sends its own X-Client-Id; start the backend with
+ADMISSION_TRUST_CLIENT_ID=1 so they are admitted as separate clients.
+"""
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+QUESTIONS = [
+    "What is the main idea of this page?",
+    "Summarize the key definitions on this page.",
+    "Explain the example in simpler terms.",
+    "What should I remember from this chapter?",
+    "How does this relate to the previous section?",
+]
+
+
+class Stats:
+    """Thread-safe collection of per-operation latencies and status codes"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, op, status, seconds):
+        with self.lock:
+            self.latencies[op].append(seconds)
+            self.statuses[op][status] += 1
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+class LoadRunner:
+    def __init__(self, args):
+        self.base_url = args.base_url.rstrip('/')
+        self.pdf_path = args.pdf
+        self.pages = args.pages
+        self.voice_id = args.voice_id
+        self.timeout = args.timeout
+        self.stats = Stats()
+        self.local = threading.local()
+
+    def session(self):
+        # One keep-alive session per worker thread, acting as one simulated student
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers['X-Client-Id'] = f"loadtest-{threading.get_ident()}"
+        return self.local.session
+
+    def upload(self):
+        with open(self.pdf_path, 'rb') as f:
+            return self.session().post(
+                f"{self.base_url}/api/pdf/upload",
+                files={'file': ('loadtest.pdf', f, 'application/pdf')},
+                timeout=self.timeout
+            )
+
+    def ask(self):
+        return self.session().post(
+            f"{self.base_url}/api/qa/ask",
+            json={'question': random.choice(QUESTIONS), 'page': random.randint(1, self.pages)},
+            timeout=self.timeout
+        )
+
+    def chat(self):
+        question = random.choice(QUESTIONS)
+        return self.session().post(
+            f"{self.base_url}/api/qa/chat",
+            json={
+                'messages': [{'role': 'user', 'content': question}],
+                'currentPage': random.randint(1, self.pages),
+                'question': question
+            },
+            timeout=self.timeout
+        )
+
+    def tts(self):
+        page = random.randint(1, self.pages)
+        return self.session().post(
+            f"{self.base_url}/api/tts/read-pdf",
+            json={
+                'page': page,
+                'voice_id': self.voice_id,
+                'lines': [f"Line {i} of page {page}, read aloud for the load test." for i in range(20)]
+            },
+            timeout=self.timeout
+        )
+
+    def run_one(self, op):
+        start = time.perf_counter()
+        try:
+            response = getattr(self, op)()
+            # Drain the body so latency includes the full transfer
+            _ = response.content
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        self.stats.record(op, status, time.perf_counter() - start)
+
+
+def report(stats, elapsed):
+    print("\n=== Load Test Results ===")
+    print(f"Elapsed: {elapsed:.1f}s")
+    header = f"{'op':<8}{'count':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  statuses"
+    print(header)
+    print('-' * len(header))
+    total = 0
+    for op in sorted(stats.latencies):
+        values = sorted(stats.latencies[op])
+        total += len(values)
+        statuses = ', '.join(f"{code}:{n}" for code, n in sorted(stats.statuses[op].items(), key=lambda x: str(x[0])))
+        print(f"{op:<8}{len(values):>8}{len(values) / elapsed:>9.2f}"
+              f"{percentile(values, 50) * 1000:>10.0f}{percentile(values, 95) * 1000:>10.0f}"
+              f"{percentile(values, 99) * 1000:>10.0f}{values[-1] * 1000:>10.0f}  {statuses}")
+    print('-' * len(header))
+    print(f"Total: {total} requests, {total / elapsed:.2f} req/s\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Smart Textbook backend')
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--pdf', help='PDF to upload before the run (and for upload operations)')
+    parser.add_argument('--pages', type=int, default=10, help='Pick pages uniformly from 1..N')
+    parser.add_argument('--voice-id', default='fake-voice-1')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30.0, help='Run time in seconds')
+    parser.add_argument('--requests', type=int, default=0, help='Stop after N requests (overrides duration)')
+    parser.add_argument('--mix', default='ask=5,chat=3,tts=2,upload=0',
+                        help='Comma-separated op=weight pairs (ops: upload, ask, chat, tts)')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    unknown = set(mix) - {'upload', 'ask', 'chat', 'tts'}
+    if unknown:
+        parser.error(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    if 'upload' in mix and not args.pdf:
+        parser.error('--pdf is required when the mix includes upload')
+
+    runner = LoadRunner(args)
+    ops, weights = list(mix), list(mix.values())
+
+    if args.pdf:
+        print(f"Uploading {args.pdf}...")
+        runner.upload().raise_for_status()
+
+    deadline = time.perf_counter() + args.duration
+    remaining = [args.requests]
+    counter_lock = threading.Lock()
+
+    def worker():
+        while True:
+            if args.requests:
+                with counter_lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+            elif time.perf_counter() >= deadline:
+                return
+            runner.run_one(random.choices(ops, weights)[0])
+
+    print(f"Running {args.concurrency} workers, mix {mix}...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.concurrency):
+            pool.submit(worker)
+    report(runner.stats, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure backend cold-start time.
+
+Each measurement runs in a fresh interpreter so nothing is cached between
+runs. Reports the time to import the app, which heavy modules that import
+pulled in, and what each heavy module costs when it is loaded on first use.
+
+    python tools/startup_time.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['openai', 'tiktoken', 'PyPDF2', 'requests']
+
+APP_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+MODULE_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import %s
+print(json.dumps({'seconds': time.perf_counter() - start}))
+"""
+
+
+def run_snippet(code):
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    # The app prints startup banners; the measurement is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report backend cold-start time')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    app_times, loaded = [], set()
+    for _ in range(args.runs):
+        measurement = run_snippet(APP_SNIPPET)
+        app_times.append(measurement['seconds'])
+        loaded.update(measurement['loaded'])
+
+    print("\n=== Startup Time Report ===")
+    print(f"import app: median {statistics.median(app_times) * 1000:.0f}ms "
+          f"(min {min(app_times) * 1000:.0f}ms, max {max(app_times) * 1000:.0f}ms, {args.runs} runs)")
+    print(f"Heavy modules loaded at import: {', '.join(sorted(loaded)) or 'none'}")
+
+    print("\nDeferred cost of each heavy module (paid on first use or by warm-up):")
+    for module in HEAVY_MODULES:
+        try:
+            times = [run_snippet(MODULE_SNIPPET % module)['seconds'] for _ in range(args.runs)]
+            print(f"  {module:<10} median {statistics.median(times) * 1000:.0f}ms")
+        except subprocess.CalledProcessError:
+            print(f"  {module:<10} not installed")
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -105,8 +105,8 @@ const AppContent = () => {
         const data = await response.json();
         console.log('Upload response:', data);
 
-        // Set the file URL
-        const fileUrl = 'http://localhost:8000/api/pdf/file/current.pdf';
+        // Set the file URL (versioned by content hash so the browser can cache it)
+        const fileUrl = `http://localhost:8000/api/pdf/file/${data.filename}?v=${data.hash}`;
         console.log('Setting file URL:', fileUrl);
         setFile(fileUrl);
 
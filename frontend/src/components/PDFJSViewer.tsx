@@ -59,7 +59,8 @@ const PDFJSViewer = forwardRef<PDFJSViewerRef, PDFJSViewerProps>(({ file, curren
       });
     }
 
-    const loadingTask = pdfjsLib.getDocument(file);
+    // Only fetch the byte ranges needed for the pages being rendered
+    const loadingTask = pdfjsLib.getDocument({ url: file, disableAutoFetch: true, disableStream: true });
     loadingTask.promise.then((doc) => {
       setPdfDoc(doc);
       setNumPages(doc.numPages);